@@ -0,0 +1,328 @@
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+
+
+def parse_timestamp(timestamp):
+    """Parse an ISO-8601 timestamp, accepting a trailing 'Z' for UTC"""
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+
+def get_time_buckets(dt):
+    """Convert a datetime to daily, weekly, and monthly bucket keys"""
+    daily_key = dt.strftime('%Y-%m-%d')
+    weekly_key = dt.strftime('%Y-%W')  # Year-Week number
+    monthly_key = dt.strftime('%Y-%m')
+
+    return daily_key, weekly_key, monthly_key
+
+
+class DeviceTimeIndex:
+    """
+    Per-device review counts bucketed by day, week and month.
+
+    Each review is indexed once, from its already-parsed timestamp, when it is
+    stored. Temporal features and device stats are then answered from the
+    buckets instead of rescanning the full review history. Only the newest
+    buckets of each granularity are retained per device, so memory grows
+    with the number of devices rather than with history.
+    """
+
+    def __init__(self, retain_days=31, retain_weeks=8, retain_months=3):
+        self.retention = {'daily': retain_days, 'weekly': retain_weeks, 'monthly': retain_months}
+        self._devices = {}
+
+    def _new_entry(self):
+        return {
+            'total': 0,
+            'daily': Counter(),
+            'weekly': Counter(),
+            'monthly': Counter(),
+            'hours': Counter(),
+            'days': Counter(),
+            'last_timestamp': None
+        }
+
+    def add(self, device_id, dt):
+        """Index a stored review posted by a device at datetime dt"""
+        daily_key, weekly_key, monthly_key = get_time_buckets(dt)
+        entry = self._devices.get(device_id)
+        if entry is None:
+            entry = self._devices[device_id] = self._new_entry()
+        entry['total'] += 1
+        for granularity, key in (('daily', daily_key), ('weekly', weekly_key), ('monthly', monthly_key)):
+            buckets = entry[granularity]
+            if key not in buckets and len(buckets) >= self.retention[granularity]:
+                # Bucket keys sort chronologically, so the minimum is the oldest
+                oldest = min(buckets)
+                if key < oldest:
+                    # Backfilled from before the retained window; the newer buckets stay
+                    continue
+                del buckets[oldest]
+            buckets[key] += 1
+        entry['hours'][dt.hour] += 1
+        entry['days'][dt.strftime('%A')] += 1
+        entry['last_timestamp'] = dt
+
+    def counts(self, device_id, dt):
+        """Return the device's review counts for the day, week and month of dt"""
+        entry = self._devices.get(device_id)
+        if entry is None:
+            return 0, 0, 0
+        daily_key, weekly_key, monthly_key = get_time_buckets(dt)
+        return entry['daily'][daily_key], entry['weekly'][weekly_key], entry['monthly'][monthly_key]
+
+    def stats(self, device_id):
+        """Return the posting patterns for a device; the daily average covers the retained days"""
+        entry = self._devices.get(device_id) or self._new_entry()
+        daily = entry['daily']
+        return {
+            'total_reviews': entry['total'],
+            'common_hours': entry['hours'].most_common(),
+            'common_days': entry['days'].most_common(),
+            'avg_reviews_per_day': sum(daily.values()) / max(1, len(daily))
+        }
+
+
+class SlidingWindowCounter:
+    """
+    Ring buffer of per-slot counts covering a fixed trailing window.
+
+    Each slot holds the count for one slot_seconds interval. A slot is reset
+    when the ring wraps around to it, so the window costs O(slots) memory and
+    O(slots) to query regardless of how many events were added.
+    """
+
+    def __init__(self, slots, slot_seconds):
+        self.slots = slots
+        self.slot_seconds = slot_seconds
+        self._counts = [0] * slots
+        self._slot_ids = [None] * slots
+
+    def add(self, epoch_seconds, amount=1):
+        """Count an event that happened at epoch_seconds"""
+        slot_id = int(epoch_seconds // self.slot_seconds)
+        position = slot_id % self.slots
+        current = self._slot_ids[position]
+        if current == slot_id:
+            self._counts[position] += amount
+        elif current is None or slot_id > current:
+            self._slot_ids[position] = slot_id
+            self._counts[position] = amount
+        # Events older than the slot already in the ring have left the window
+
+    def count(self, now_epoch_seconds):
+        """Return the number of events in the window ending at now_epoch_seconds"""
+        newest = int(now_epoch_seconds // self.slot_seconds)
+        oldest = newest - self.slots
+        return sum(count for slot_id, count in zip(self._slot_ids, self._counts)
+                   if slot_id is not None and oldest < slot_id <= newest)
+
+
+class TopCounter:
+    """Counter that keeps its k largest keys ordered, for counts that only grow"""
+
+    def __init__(self, k=10):
+        self.k = k
+        self.counts = Counter()
+        self._top = []
+
+    def increment(self, key, amount=1):
+        self.counts[key] += amount
+        if key not in self._top:
+            if len(self._top) < self.k:
+                self._top.append(key)
+            elif self.counts[key] > self.counts[self._top[-1]]:
+                self._top[-1] = key
+            else:
+                return
+        self._top.sort(key=self.counts.__getitem__, reverse=True)
+
+    def most_common(self, n=None):
+        keys = self._top if n is None else self._top[:n]
+        return [(key, self.counts[key]) for key in keys]
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class ReviewAggregates:
+    """
+    Review-wide histograms maintained at write time.
+
+    Backs /api/analytics/summary and /api/temporal/patterns so that both are
+    answered from fixed-size buckets instead of scanning every stored review.
+    """
+
+    def __init__(self, top_k=10):
+        self.total = 0
+        self.review_days = Counter()
+        self.hour_predictions = [Counter() for _ in range(24)]
+        self.day_counts = Counter()
+        self.devices = TopCounter(top_k)
+        self.last_24_hours = SlidingWindowCounter(slots=24 * 60, slot_seconds=60)
+        self.last_week = SlidingWindowCounter(slots=7 * 24, slot_seconds=3600)
+
+    def add(self, device_id, dt, prediction):
+        """Account for a stored review posted at datetime dt"""
+        epoch = dt.timestamp()
+        self.total += 1
+        self.review_days[dt.strftime('%Y-%m-%d')] += 1
+        self.hour_predictions[dt.hour][prediction] += 1
+        self.day_counts[dt.strftime('%A')] += 1
+        if device_id:
+            self.devices.increment(device_id)
+        self.last_24_hours.add(epoch)
+        self.last_week.add(epoch)
+
+    def reviews_on(self, day):
+        """Return the number of reviews posted on a given date"""
+        return self.review_days[day.strftime('%Y-%m-%d')]
+
+    def hourly_distribution(self):
+        return {hour: sum(counts.values())
+                for hour, counts in enumerate(self.hour_predictions) if counts}
+
+    def prediction_by_hour(self, fake_label):
+        """Return per-hour review totals and the share predicted as fake_label"""
+        hour_predictions = {}
+        for hour, counts in enumerate(self.hour_predictions):
+            hour_total = sum(counts.values())
+            if hour_total:
+                hour_predictions[hour] = {
+                    'total_reviews': hour_total,
+                    'fake_percentage': (counts[fake_label] / hour_total) * 100
+                }
+        return hour_predictions
+
+    def recent_trends(self, now):
+        epoch = now.timestamp()
+        return {
+            'last_24_hours': self.last_24_hours.count(epoch),
+            'last_week': self.last_week.count(epoch)
+        }
+
+
+class AnalyticsState:
+    """
+    Device registry and review analytics shared by every API worker.
+
+    Groups the daily/weekly/monthly volume stats, the per-device index and
+    the review aggregates behind one lock, so a single instance can be used
+    in-process or served to several worker processes (see analytics_server.py).
+    Methods take and return plain picklable values for that reason.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.devices = {}
+        self.daily_stats = defaultdict(int)
+        self.weekly_stats = defaultdict(int)
+        self.monthly_stats = defaultdict(int)
+        self.device_index = DeviceTimeIndex()
+        self.aggregates = ReviewAggregates()
+
+    def register_device(self, device_id, device):
+        with self._lock:
+            self.devices[device_id] = dict(device)
+
+    def get_device(self, device_id):
+        with self._lock:
+            device = self.devices.get(device_id)
+            return dict(device) if device else None
+
+    def total_reviews(self):
+        return self.aggregates.total
+
+    def _record(self, device_id, posted_at, prediction, seen_at):
+        daily_key, weekly_key, monthly_key = get_time_buckets(posted_at)
+        self.daily_stats[daily_key] += 1
+        self.weekly_stats[weekly_key] += 1
+        self.monthly_stats[monthly_key] += 1
+        self.device_index.add(device_id, posted_at)
+        self.aggregates.add(device_id, posted_at, prediction)
+        device = self.devices.get(device_id) if device_id else None
+        if device is not None:
+            if seen_at:
+                device['last_seen'] = seen_at
+            device['total_reviews'] += 1
+            return dict(device)
+        return None
+
+    def record_reviews(self, entries):
+        """
+        Account for scored reviews given as (device_id, posted_at, prediction, seen_at).
+
+        Returns, per review, its temporal features (counted before the review
+        itself, but after earlier entries) and the updated device registration,
+        or None for unregistered devices.
+        """
+        results = []
+        with self._lock:
+            for device_id, posted_at, prediction, seen_at in entries:
+                today_reviews, week_reviews, month_reviews = self.device_index.counts(device_id, posted_at)
+                temporal_features = {
+                    'reviews_today': today_reviews,
+                    'reviews_this_week': week_reviews,
+                    'reviews_this_month': month_reviews,
+                    'posting_hour': posted_at.hour,
+                    'posting_day': posted_at.strftime('%A'),
+                    'is_weekend': posted_at.weekday() >= 5
+                }
+                results.append((temporal_features, self._record(device_id, posted_at, prediction, seen_at)))
+        return results
+
+    def restore(self, devices, reviews):
+        """Rebuild state from persisted devices and (device_id, timestamp, prediction) rows"""
+        restored = 0
+        with self._lock:
+            self.devices.update(devices)
+            for device_id, timestamp, prediction in reviews:
+                posted_at = parse_timestamp(timestamp)
+                daily_key, weekly_key, monthly_key = get_time_buckets(posted_at)
+                self.daily_stats[daily_key] += 1
+                self.weekly_stats[weekly_key] += 1
+                self.monthly_stats[monthly_key] += 1
+                self.device_index.add(device_id, posted_at)
+                self.aggregates.add(device_id, posted_at, prediction)
+                restored += 1
+        return restored
+
+    def summary(self, today):
+        with self._lock:
+            most_active = self.aggregates.devices.most_common(1)
+            most_active_device = most_active[0] if most_active else (None, 0)
+            return {
+                'total_reviews': self.aggregates.total,
+                'unique_devices': len(self.devices),
+                'reviews_today': self.aggregates.reviews_on(today),
+                'daily_stats': dict(self.daily_stats),
+                'weekly_stats': dict(self.weekly_stats),
+                'monthly_stats': dict(self.monthly_stats),
+                'most_active_device': {
+                    'device_id': most_active_device[0],
+                    'review_count': most_active_device[1]
+                } if most_active_device[0] else None,
+                'device_activity_distribution': dict(self.aggregates.devices.counts)
+            }
+
+    def temporal_patterns(self, now, fake_label):
+        with self._lock:
+            if not self.aggregates.total:
+                return None
+            return {
+                'total_reviews': self.aggregates.total,
+                'hourly_distribution': self.aggregates.hourly_distribution(),
+                'daily_distribution': dict(self.aggregates.day_counts),
+                'prediction_by_hour': self.aggregates.prediction_by_hour(fake_label),
+                'recent_trends': self.aggregates.recent_trends(now)
+            }
+
+    def device_stats(self, device_id):
+        with self._lock:
+            device = self.devices.get(device_id)
+            if device is None:
+                return None
+            stats = self.device_index.stats(device_id)
+            stats.update({'first_seen': device['created_at'], 'last_seen': device['last_seen']})
+            return stats
@@ -0,0 +1,138 @@
+"""
+Shared analytics service for multi-worker deployments.
+
+One process owns the AnalyticsState and the near-duplicate index and serves
+them over a multiprocessing manager, so every API worker sees the same
+device registry, review counts and similarity history. gunicorn.conf.py
+starts it from the gunicorn master before the workers are forked; it can
+also be run on its own:
+
+    python analytics_server.py --address /tmp/fake-review-analytics.sock
+"""
+import argparse
+import logging
+import os
+import secrets
+import signal
+import subprocess
+import sys
+from multiprocessing.managers import BaseManager
+
+from analytics import AnalyticsState
+from similarity import MinHashLSH
+from storage import ReviewStore
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsManager(BaseManager):
+    pass
+
+
+def parse_address(value):
+    """Accept either a unix socket path or host:port"""
+    host, sep, port = value.rpartition(':')
+    if sep and port.isdigit() and '/' not in value:
+        return host, int(port)
+    return value
+
+
+def load_similarity_index(path, capacity):
+    """Restore the near-duplicate index snapshot, or start an empty one"""
+    if path and os.path.exists(path):
+        try:
+            index = MinHashLSH.load(path)
+            logger.info(f"Loaded similarity index with {len(index)} reviews from {path}")
+            return index
+        except Exception as e:
+            logger.error(f"Error loading similarity index: {e}")
+    return MinHashLSH(capacity=capacity)
+
+
+def restore_analytics(state, store):
+    """Rebuild analytics state from the persistent review store"""
+    restored = state.restore(store.load_devices(), store.iter_reviews())
+    logger.info(f"Restored {restored} reviews from {store.path}")
+    return restored
+
+
+def serve(address, authkey, db_path, similarity_path, similarity_capacity):
+    """Load the shared state and serve it until the process is terminated"""
+    logging.basicConfig(level=logging.INFO)
+    state = AnalyticsState()
+    store = ReviewStore(db_path)
+    restore_analytics(state, store)
+    store.close()
+    index = load_similarity_index(similarity_path, similarity_capacity)
+
+    AnalyticsManager.register('analytics', callable=lambda: state)
+    AnalyticsManager.register('similarity_index', callable=lambda: index)
+    server = AnalyticsManager(address=address, authkey=authkey).get_server()
+
+    def shutdown(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    logger.info(f"Analytics server listening on {address}")
+    try:
+        server.serve_forever()
+    finally:
+        if similarity_path:
+            index.save(similarity_path)
+            logger.info(f"Saved similarity index to {similarity_path}")
+
+
+def start_server_process(address, authkey, db_path, similarity_path, similarity_capacity):
+    """
+    Run this module as a separate server process and return its Popen.
+
+    A fresh interpreter is used rather than a fork so the server does not
+    inherit the caller's loaded model, and forked workers do not inherit a
+    multiprocessing child handle for it.
+    """
+    env = dict(os.environ, ANALYTICS_SERVER_AUTHKEY=authkey.decode())
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), '--address', address, '--db', db_path,
+                             '--similarity-index', similarity_path,
+                             '--similarity-capacity', str(similarity_capacity)], env=env)
+
+
+def connect(address, authkey, retries=50, delay=0.1):
+    """Connect to a running analytics server, returning (analytics, similarity_index) proxies"""
+    import time
+
+    AnalyticsManager.register('analytics')
+    AnalyticsManager.register('similarity_index')
+    manager = AnalyticsManager(address=address, authkey=authkey)
+    for attempt in range(retries):
+        try:
+            manager.connect()
+            break
+        except (ConnectionRefusedError, FileNotFoundError):
+            if attempt == retries - 1:
+                raise
+            time.sleep(delay)
+    return manager.analytics(), manager.similarity_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument('--address', default=os.environ.get('ANALYTICS_SERVER_ADDRESS'), required=False)
+    parser.add_argument('--db', default=os.environ.get('ANALYTICS_DB_PATH', os.path.join(base_dir, 'analytics.db')))
+    parser.add_argument('--similarity-index', default=os.environ.get(
+        'SIMILARITY_INDEX_PATH', os.path.join(base_dir, 'similarity_index.npz')))
+    parser.add_argument('--similarity-capacity', type=int,
+                        default=int(os.environ.get('SIMILARITY_INDEX_CAPACITY', 500_000)))
+    args = parser.parse_args()
+    if not args.address:
+        parser.error('--address or ANALYTICS_SERVER_ADDRESS is required')
+
+    authkey = os.environ.get('ANALYTICS_SERVER_AUTHKEY')
+    if not authkey:
+        authkey = secrets.token_hex(16)
+        print(f"ANALYTICS_SERVER_AUTHKEY={authkey}")
+    serve(parse_address(args.address), authkey.encode(), args.db, args.similarity_index, args.similarity_capacity)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,25 @@
 import os
-import joblib
+import sys
 import numpy as np
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 import uuid
-import json
-from collections import defaultdict, Counter
+import atexit
+import hashlib
+import time
+from collections import namedtuple
+
+from analytics import AnalyticsState, parse_timestamp
+from analytics_server import connect, load_similarity_index, parse_address, restore_analytics
+from batching import MicroBatcher
+from cache import PredictionCache
+from engine import Engine
+from metrics import REGISTRY, StackSampler, reset_pid, stage
+from online import OnlineLearner
+from similarity import MinHasher
+from storage import ReviewStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -16,80 +28,267 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
-# In-memory storage for demo (use database in production)
-analytics_data = {
-    'reviews': [],
-    'devices': {},
-    'daily_stats': defaultdict(int),
-    'weekly_stats': defaultdict(int),
-    'monthly_stats': defaultdict(int)
-}
-
-
-# Load new model files
-try:
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    model_path = os.path.join(base_dir, 'TfidfModel1.pickle')
-    X_path = os.path.join(base_dir, 'X1.pickle')
-    y_path = os.path.join(base_dir, 'y1.pickle')
-
-    model = joblib.load(model_path)
-    X = joblib.load(X_path)
-    y = joblib.load(y_path)
-    logger.info("New model files loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading new model files: {e}")
-    model = None
-    X = None
-    y = None
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Linguistic features share their implementation with offline feature
+# engineering in ../src; they are optional and need spaCy, which is only
+# imported when they are enabled
+sys.path.append(os.path.join(base_dir, '..', 'src'))
+LINGUISTIC_FEATURE_NAMES = None
+
+# spaCy model for the linguistic features (e.g. en_core_web_sm); unset disables them
+LINGUISTIC_FEATURES_MODEL = os.environ.get('LINGUISTIC_FEATURES_MODEL', '')
+linguistic_extractor = None
+
+# Reviews and device registrations are persisted to SQLite; only the
+# analytics aggregates and a capped tail of recent records stay in memory
+ANALYTICS_DB_PATH = os.environ.get('ANALYTICS_DB_PATH', os.path.join(base_dir, 'analytics.db'))
+RECENT_REVIEWS_LIMIT = int(os.environ.get('RECENT_REVIEWS_LIMIT', 1000))
+
+# Statistical profiler sampling every PROFILE_SAMPLE_INTERVAL_MS (0 disables
+# it); the folded stacks are served at /api/profile
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 0))
+profiler = None
+
+# Per-worker state, set up by init_analytics()
+review_store = None
+analytics = None
+similarity_index = None
+review_hasher = None
+
+# Upper bound on reviews accepted by /api/predict/batch in a single request
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+
+HUMAN_LABEL = 'Human Written'
+FAKE_LABEL = 'AI Generated'
+
+
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+    max_bytes=int(os.environ.get('PREDICTION_CACHE_MAX_BYTES', 0)) or None,
+    ttl=float(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+)
+
+# Near-duplicate index over every review scored by the API; snapshotted on exit
+SIMILARITY_INDEX_PATH = os.environ.get('SIMILARITY_INDEX_PATH', os.path.join(base_dir, 'similarity_index.npz'))
+SIMILARITY_INDEX_CAPACITY = int(os.environ.get('SIMILARITY_INDEX_CAPACITY', 500_000))
+
+model_path = os.path.join(base_dir, 'TfidfModel1.pickle')
+feature_pipeline_path = os.path.join(base_dir, 'feature_pipeline.pickle')
+# NumPy-only export of the two pickles above (see engine.py); used when present
+ENGINE_PATH = os.environ.get('ENGINE_PATH', os.path.join(base_dir, 'engine'))
+
+# Incremental retraining from /api/feedback labels (see online.py). Enabling it
+# also keeps the full text of scored reviews in the review store to train on
+ONLINE_LEARNING = os.environ.get('ONLINE_LEARNING', '').lower() in ('1', 'true', 'yes')
+ONLINE_MODEL_PATH = os.environ.get('ONLINE_MODEL_PATH', os.path.join(base_dir, 'online_model'))
+online_learner = None
+
+# The model and feature pipeline answering requests, and their version, are
+# swapped together as one tuple; each request reads it once
+ServingModel = namedtuple('ServingModel', ['model', 'feature_extractor', 'version'])
+base_model = None
+serving = None
+
+def file_digest(*paths):
+    """Short content hash identifying a set of model files"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def load_engine():
+    """The exported engine, which serves as both model and feature pipeline"""
+    engine = Engine(ENGINE_PATH)
+    manifest_path = os.path.join(ENGINE_PATH, 'manifest.json')
+    if any(os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(manifest_path)
+           for path in (model_path, feature_pipeline_path)):
+        logger.warning("Model pickles are newer than the engine export; run engine.py to refresh it")
+    return engine, engine, engine.version
+
+def load_pickles():
+    """The scikit-learn model and feature pipeline fitted by build_features.py"""
+    import joblib
+    return joblib.load(model_path), joblib.load(feature_pipeline_path), file_digest(model_path, feature_pipeline_path)
+
+def check_serving_model(loaded):
+    """Raise ValueError unless the model is a classifier fitted on the feature pipeline's output"""
+    feats = loaded.feature_extractor.transform(['Warm-up review text for the feature pipeline.'])
+    model = loaded.model
+    if not hasattr(model, 'predict_proba') or not hasattr(model, 'classes_'):
+        raise ValueError(f"{type(model).__name__} is not a fitted classifier; "
+                         f"run build_features.py with --train-model")
+    n_features = getattr(model, 'n_features_in_', feats.shape[1])
+    if n_features != feats.shape[1]:
+        raise ValueError(f"Model expects {n_features} features but the pipeline produces {feats.shape[1]}; "
+                         f"run build_features.py with --train-model")
+    model.predict_proba(feats)
+
+def load_model():
+    """Load (or reload) the model files and invalidate cached predictions"""
+    global base_model
+    try:
+        if os.path.exists(os.path.join(ENGINE_PATH, 'manifest.json')):
+            loaded = ServingModel(*load_engine())
+        else:
+            loaded = ServingModel(*load_pickles())
+        # Also warms up the feature pipeline so the first request does not pay for lazy loading
+        check_serving_model(loaded)
+        base_model = loaded
+        logger.info(f"New model files loaded successfully (version {loaded.version}, "
+                    f"{'engine' if isinstance(loaded.model, Engine) else 'pickles'})")
+    except Exception as e:
+        logger.error(f"Error loading new model files: {e}")
+        base_model = None
+    swap_model(base_model)
+    if online_learner is not None:
+        # Re-apply a published online model trained on this base
+        online_learner.reset()
+    return base_model is not None
+
+def swap_model(new_serving):
+    """Start serving new_serving (a ServingModel, or None) and drop predictions cached for the old one"""
+    global serving
+    serving = new_serving
+    prediction_cache.clear()
+
+def install_online_model(online_model):
+    """Serve an OnlineModel published by the trainer, unless the base model has changed under it"""
+    if base_model is not None and online_model.base_version == base_model.version:
+        swap_model(ServingModel(online_model, online_model, online_model.version))
+
+def load_linguistic_extractor():
+    """Load the optional spaCy linguistic feature extractor"""
+    global linguistic_extractor, LINGUISTIC_FEATURE_NAMES
+    if not LINGUISTIC_FEATURES_MODEL:
+        return
+    try:
+        from feature_engineering import LinguisticFeatureExtractor, FEATURE_NAMES as LINGUISTIC_FEATURE_NAMES
+    except ImportError as e:
+        logger.error(f"LINGUISTIC_FEATURES_MODEL is set but src/feature_engineering.py could not be imported: {e}")
+        return
+    try:
+        extractor = LinguisticFeatureExtractor(LINGUISTIC_FEATURES_MODEL)
+        extractor.transform(['Warm-up review text for the feature pipeline.'])
+        linguistic_extractor = extractor
+        logger.info(f"Linguistic features enabled ({LINGUISTIC_FEATURES_MODEL})")
+    except Exception as e:
+        logger.error(f"Error loading linguistic feature extractor: {e}")
+
+def init_analytics():
+    """
+    Open this process's review store and attach to the analytics state.
+
+    With ANALYTICS_SERVER_ADDRESS set, analytics and the similarity index are
+    proxies to the shared analytics server and only MinHash signatures are
+    computed locally; otherwise both are rebuilt in this process.
+    """
+    global review_store, analytics, similarity_index, review_hasher, profiler
+    reset_pid()
+    if PROFILE_SAMPLE_INTERVAL_MS > 0:
+        profiler = StackSampler(PROFILE_SAMPLE_INTERVAL_MS / 1000).start()
+    review_store = ReviewStore(ANALYTICS_DB_PATH, recent_limit=RECENT_REVIEWS_LIMIT)
+    atexit.register(review_store.close)
+
+    # Read at init rather than import time: gunicorn.conf.py sets these after preloading the app
+    address = os.environ.get('ANALYTICS_SERVER_ADDRESS')
+    if address:
+        analytics, similarity_index = connect(parse_address(address),
+                                              os.environ.get('ANALYTICS_SERVER_AUTHKEY', '').encode())
+        review_hasher = MinHasher(**similarity_index.hasher_params())
+        logger.info(f"Worker {os.getpid()} connected to analytics server at {address}")
+    else:
+        analytics = AnalyticsState()
+        restore_analytics(analytics, review_store)
+        similarity_index = load_similarity_index(SIMILARITY_INDEX_PATH, SIMILARITY_INDEX_CAPACITY)
+        atexit.register(similarity_index.save, SIMILARITY_INDEX_PATH)
+        review_hasher = similarity_index.hasher
+    init_online_learning()
+
+def init_online_learning():
+    """Start this process's online learner; one process trains, every process loads what it publishes"""
+    global online_learner
+    if not ONLINE_LEARNING:
+        return
+    if base_model is not None and list(base_model.model.classes_) != [0, 1]:
+        logger.error("Online learning needs a binary model with classes [0, 1]; disabled")
+        return
+    online_learner = OnlineLearner(
+        review_store, ONLINE_MODEL_PATH,
+        get_base=lambda: base_model,
+        get_serving=lambda: serving,
+        swap=install_online_model,
+        poll_interval=float(os.environ.get('ONLINE_POLL_INTERVAL', 5)),
+        n_features=2 ** int(os.environ.get('ONLINE_HASH_BITS', 18)),
+        batch_size=int(os.environ.get('ONLINE_BATCH_SIZE', 256)),
+        holdout_percent=int(os.environ.get('ONLINE_HOLDOUT_PERCENT', 20)),
+        holdout_size=int(os.environ.get('ONLINE_HOLDOUT_SIZE', 2000)),
+        min_holdout=int(os.environ.get('ONLINE_MIN_HOLDOUT', 50))
+    ).start()
+
+def create_app(init_worker_state=True):
+    """
+    Load the model and return the Flask app.
+
+    gunicorn.conf.py passes init_worker_state=False so the model is loaded
+    once in the master and shared copy-on-write, and calls init_analytics()
+    in each worker after the fork.
+    """
+    load_model()
+    load_linguistic_extractor()
+    if init_worker_state:
+        init_analytics()
+    return app
+
+REQUEST_SECONDS = REGISTRY.histogram('fake_review_http_request_seconds', 'Time to handle an API request',
+                                     ('endpoint', 'method'))
+REQUESTS = REGISTRY.counter('fake_review_http_requests_total', 'API requests by response status',
+                            ('endpoint', 'method', 'status'))
+
+@app.before_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # The route pattern (e.g. /api/device/<device_id>/stats) keeps label values bounded
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUEST_SECONDS.observe(time.perf_counter() - g.request_started_at, endpoint, request.method)
+    REQUESTS.inc(endpoint, request.method, str(response.status_code))
+    return response
+
+def collect_metrics():
+    """Gauges and counters read from the cache, micro-batcher, analytics and profiler at scrape time"""
+    cache_stats = prediction_cache.stats()
+    batch_stats = scoring_batcher.stats()
+    yield ('fake_review_prediction_cache_events_total', 'counter', 'Prediction cache lookups and removals by outcome',
+           [({'event': event}, cache_stats[event]) for event in ('hits', 'misses', 'evictions', 'expirations')])
+    yield ('fake_review_prediction_cache_entries', 'gauge', 'Predictions currently cached',
+           [({}, cache_stats['entries'])])
+    yield ('fake_review_batcher_batches_total', 'counter', 'Model calls made by the micro-batcher',
+           [({}, batch_stats['batches'])])
+    yield ('fake_review_batcher_rows_total', 'counter', 'Feature rows scored by the micro-batcher',
+           [({}, batch_stats['rows'])])
+    yield ('fake_review_batcher_queue_depth', 'gauge', 'Requests waiting for the micro-batcher',
+           [({}, batch_stats['queue_depth'])])
+    if analytics is not None:
+        yield ('fake_review_analytics_reviews', 'gauge', 'Reviews counted in the analytics state',
+               [({}, analytics.total_reviews())])
+    if serving is not None:
+        yield ('fake_review_model_info', 'gauge', 'The model serving predictions',
+               [({'version': serving.version}, 1)])
+    if profiler is not None:
+        yield ('fake_review_profiler_samples_total', 'counter', 'Stack samples taken by the profiler',
+               [({}, profiler.samples)])
+
+REGISTRY.register_collector(collect_metrics)
 
 def generate_device_id():
     """Generate a unique device identifier"""
     return str(uuid.uuid4())
 
-def get_time_buckets(timestamp):
-    """Convert timestamp to daily, weekly, and monthly buckets"""
-    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-    
-    daily_key = dt.strftime('%Y-%m-%d')
-    weekly_key = dt.strftime('%Y-%W')  # Year-Week number
-    monthly_key = dt.strftime('%Y-%m')
-    
-    return daily_key, weekly_key, monthly_key
-
-def calculate_temporal_features(device_id, timestamp):
-    """Calculate temporal features for a device"""
-    daily_key, weekly_key, monthly_key = get_time_buckets(timestamp)
-    
-    # Update statistics
-    analytics_data['daily_stats'][daily_key] += 1
-    analytics_data['weekly_stats'][weekly_key] += 1
-    analytics_data['monthly_stats'][monthly_key] += 1
-    
-    # Calculate device-specific stats
-    device_reviews = [r for r in analytics_data['reviews'] if r.get('device_id') == device_id]
-    
-    today_reviews = len([r for r in device_reviews if 
-                        datetime.fromisoformat(r['timestamp'].replace('Z', '+00:00')).date() == 
-                        datetime.fromisoformat(timestamp.replace('Z', '+00:00')).date()])
-    
-    week_reviews = len([r for r in device_reviews if 
-                       datetime.fromisoformat(r['timestamp'].replace('Z', '+00:00')).strftime('%Y-%W') == 
-                       datetime.fromisoformat(timestamp.replace('Z', '+00:00')).strftime('%Y-%W')])
-    
-    month_reviews = len([r for r in device_reviews if 
-                        datetime.fromisoformat(r['timestamp'].replace('Z', '+00:00')).strftime('%Y-%m') == 
-                        datetime.fromisoformat(timestamp.replace('Z', '+00:00')).strftime('%Y-%m')])
-    
-    return {
-        'reviews_today': today_reviews,
-        'reviews_this_week': week_reviews,
-        'reviews_this_month': month_reviews,
-        'posting_hour': datetime.fromisoformat(timestamp.replace('Z', '+00:00')).hour,
-        'posting_day': datetime.fromisoformat(timestamp.replace('Z', '+00:00')).strftime('%A'),
-        'is_weekend': datetime.fromisoformat(timestamp.replace('Z', '+00:00')).weekday() >= 5
-    }
-
 def create_dummy_features(frontend_data, temporal_features):
     """
     Create dummy features including temporal analysis
@@ -115,20 +314,22 @@ def create_dummy_features(frontend_data, temporal_features):
 @app.route('/api/health')
 def health_check():
     return jsonify({
-        'status': 'healthy' if model and vectorizer else 'unhealthy',
+        'status': 'healthy' if serving is not None else 'unhealthy',
         'timestamp': datetime.now().isoformat(),
-        'analytics_total': len(analytics_data['reviews'])
+        'analytics_total': analytics.total_reviews()
     })
 
 @app.route('/api/device/register', methods=['POST'])
 def register_device():
     """Register a new device and return device ID"""
     device_id = generate_device_id()
-    analytics_data['devices'][device_id] = {
+    device = {
         'created_at': datetime.now().isoformat(),
         'last_seen': datetime.now().isoformat(),
         'total_reviews': 0
     }
+    analytics.register_device(device_id, device)
+    review_store.save_device(device_id, device)
     
     logger.info(f"New device registered: {device_id}")
     
@@ -141,189 +342,406 @@ def register_device():
 @app.route('/api/analytics/summary')
 def get_analytics_summary():
     """Get comprehensive analytics summary"""
-    total_reviews = len(analytics_data['reviews'])
-    unique_devices = len(analytics_data['devices'])
-    
-    # Calculate recent activity
-    today = datetime.now().date()
-    reviews_today = len([r for r in analytics_data['reviews'] if 
-                        datetime.fromisoformat(r['timestamp'].replace('Z', '+00:00')).date() == today])
-    
-    # Device activity distribution
-    device_activity = Counter([r.get('device_id') for r in analytics_data['reviews'] if r.get('device_id')])
-    most_active_device = device_activity.most_common(1)[0] if device_activity else (None, 0)
-    
-    return jsonify({
-        'total_reviews': total_reviews,
-        'unique_devices': unique_devices,
-        'reviews_today': reviews_today,
-        'daily_stats': dict(analytics_data['daily_stats']),
-        'weekly_stats': dict(analytics_data['weekly_stats']),
-        'monthly_stats': dict(analytics_data['monthly_stats']),
-        'most_active_device': {
-            'device_id': most_active_device[0],
-            'review_count': most_active_device[1]
-        } if most_active_device[0] else None,
-        'device_activity_distribution': dict(device_activity)
-    })
+    return jsonify(analytics.summary(datetime.now().date()))
 
-@app.route('/api/predict', methods=['POST'])
-
-def predict():
-    if model is None or X is None or y is None:
-        return jsonify({'error': 'Model not loaded properly'}), 500
+def parse_review_input(data):
+    """Validate a review payload, returning (review fields, error message)"""
+    if not isinstance(data, dict):
+        return None, 'Invalid review payload.'
 
-    data = request.get_json()
-    review_text = data.get('review', '').strip()
-    rating = data.get('rating', None)
-    category = data.get('category', '')
-    device_id = data.get('device_id', '')
+    review_text = data.get('review', '')
+    device_id = data.get('device_id') or ''
     user_timestamp = data.get('timestamp', datetime.now().isoformat())
 
+    if not isinstance(review_text, str):
+        return None, 'Review text must be a string.'
+    if not isinstance(device_id, str):
+        return None, 'device_id must be a string.'
+    review_text = review_text.strip()
     if not review_text:
-        return jsonify({'error': 'No review text provided.'}), 400
+        return None, 'No review text provided.'
     if len(review_text) < 10:
-        return jsonify({'error': 'Review text too short. Minimum 10 characters required.'}), 400
+        return None, 'Review text too short. Minimum 10 characters required.'
+    try:
+        posted_at = parse_timestamp(user_timestamp)
+    except (AttributeError, TypeError, ValueError):
+        return None, 'Invalid timestamp format.'
+
+    return {
+        'review_id': str(uuid.uuid4()),
+        'review_text': review_text,
+        'rating': data.get('rating', None),
+        'category': data.get('category', ''),
+        'device_id': device_id,
+        'timestamp': user_timestamp,
+        'posted_at': posted_at
+    }, None
+
+def extract_features(current, review_texts, similarities):
+    """Build the model feature matrix (sentiment, similarity, LSA, ...) for a list of reviews"""
+    return current.feature_extractor.transform(review_texts, similarity=similarities)
+
+def predict_proba_batch(feats):
+    """Model call run by the micro-batcher on the stacked rows of concurrent requests"""
+    return serving.model.predict_proba(feats)
+
+# Concurrent requests share predict_proba calls. With the default max wait
+# of 0 a batch is whatever queued up while the previous one was scored (see
+# benchmarks/bench_batching.py); a few ms of wait trades latency for larger batches
+scoring_batcher = MicroBatcher(
+    predict_proba_batch,
+    max_batch_size=int(os.environ.get('PREDICT_BATCH_MAX_SIZE', 64)),
+    max_wait=float(os.environ.get('PREDICT_BATCH_MAX_WAIT_MS', 0)) / 1000
+)
+
+def score_features(current, feats):
+    """Score a feature matrix through the micro-batcher, returning labels and probabilities"""
+    # Rows are batched only with other requests' rows for the same model
+    probabilities = scoring_batcher(feats, current.model.predict_proba)
+    predictions = current.model.classes_[probabilities.argmax(axis=1)]
+    labels = [HUMAN_LABEL if prediction == 1 else FAKE_LABEL for prediction in predictions]
+    return labels, probabilities
+
+def predict_reviews(reviews):
+    """
+    Return features, labels, probabilities, nearest neighbours and pending index/cache entries for a list of reviews.
+
+    Each review is compared with the previously indexed reviews (including
+    earlier ones in the same list). Repeated texts with the same neighbour
+    similarity are served from the prediction cache; the remaining reviews
+    are featurized and scored together in one model call. Nothing is indexed
+    or cached here: pass the pending entries of the reviews that were stored
+    to index_predictions().
+    """
+    current = serving
+    review_texts = [review['review_text'] for review in reviews]
+    with stage('similarity'):
+        # Signatures are computed here; only the lookup touches the (possibly shared) index
+        signatures = [review_hasher.signature(text) for text in review_texts]
+        neighbours = [(reviews[neighbour]['review_id'] if isinstance(neighbour, int) else neighbour, score)
+                      for neighbour, score in similarity_index.query_signatures(signatures)]
+        similarities = np.array([score for _, score in neighbours])
+
+    feats = np.empty((len(reviews), len(current.feature_extractor.get_feature_names_out())))
+    probabilities = np.empty((len(reviews), len(current.model.classes_)))
+    labels = [None] * len(reviews)
+    keys = [PredictionCache.make_key(text, current.version, round(similarity, 2))
+            for text, similarity in zip(review_texts, similarities)]
+
+    cache_entries = [None] * len(reviews)
+    misses = []
+    with stage('cache'):
+        for i, key in enumerate(keys):
+            cached = prediction_cache.get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                feats[i], labels[i], probabilities[i] = cached
+                feats[i, 1] = similarities[i]
+
+    if misses:
+        with stage('features'):
+            miss_feats = extract_features(current, [review_texts[i] for i in misses], similarities[misses])
+        with stage('predict_proba'):
+            miss_labels, miss_probabilities = score_features(current, miss_feats)
+        for row, i in enumerate(misses):
+            feats[i], labels[i], probabilities[i] = miss_feats[row], miss_labels[row], miss_probabilities[row]
+            cache_entries[i] = (keys[i], (miss_feats[row], miss_labels[row], miss_probabilities[row]),
+                                miss_feats[row].nbytes + miss_probabilities[row].nbytes)
+    return feats, labels, probabilities, neighbours, list(zip(signatures, cache_entries))
 
+def index_predictions(reviews, pending):
+    """Add stored reviews to the similarity index and cache their new predictions"""
+    similarity_index.add_signatures([review['review_id'] for review in reviews],
+                                    [signature for signature, _ in pending])
+    for _, cache_entry in pending:
+        if cache_entry is not None:
+            key, value, size = cache_entry
+            prediction_cache.put(key, value, size=size)
+
+def extract_linguistic_features(review_texts):
+    """Linguistic features for each review as a dict, or None when they are disabled"""
+    if linguistic_extractor is None:
+        return [None] * len(review_texts)
     try:
-        temporal_features = calculate_temporal_features(device_id, user_timestamp)
+        with stage('linguistic'):
+            feats = linguistic_extractor.transform(review_texts)
+    except Exception as e:
+        logger.error(f"Linguistic feature error: {e}")
+        return [None] * len(review_texts)
+    # float32 values rounded so they serialize without float32 noise
+    return [{name: round(value, 6) for name, value in zip(LINGUISTIC_FEATURE_NAMES, row.tolist())} for row in feats]
+
+def store_prediction(review, result, probabilities, feature_row, neighbour, temporal_features,
+                     linguistic_features=None):
+    """Record a scored review in the analytics stores and return the record"""
+    review_text = review['review_text']
+    device_id = review['device_id']
+    sentiment, similarity_score, lsa_score = (float(value) for value in feature_row[:3])
+    review_record = {
+        'id': review['review_id'],
+        'review_preview': review_text[:100] + '...' if len(review_text) > 100 else review_text,
+        'prediction': result,
+        'confidence': float(max(probabilities)),
+        'rating': review['rating'],
+        'category': review['category'],
+        'device_id': device_id,
+        'timestamp': review['timestamp'],
+        'temporal_features': temporal_features,
+        'analysis_timestamp': datetime.now().isoformat(),
+        'sentiment': sentiment,
+        'similarity_score': similarity_score,
+        'lsa_score': lsa_score,
+        'nearest_review_id': neighbour[0],
+        'linguistic_features': linguistic_features
+    }
+    with stage('store'):
+        review_store.append(review_record, review_text if ONLINE_LEARNING else None)
+    return review_record
+
+def record_predictions(reviews, labels):
+    """Fold scored reviews into the analytics state, returning their temporal features"""
+    seen_at = datetime.now().isoformat()
+    with stage('analytics'):
+        results = analytics.record_reviews([(review['device_id'], review['posted_at'], label, seen_at)
+                                            for review, label in zip(reviews, labels)])
+    for review, (_, device) in zip(reviews, results):
+        if device is not None:
+            review_store.save_device(review['device_id'], device)
+    return [temporal_features for temporal_features, _ in results]
+
+def build_prediction_response(review, review_record, probabilities):
+    """Shape a stored prediction into the /api/predict response body"""
+    temporal_features = review_record['temporal_features']
+    return {
+        'id': review_record['id'],
+        'prediction': review_record['prediction'],
+        'probabilities': probabilities.tolist(),
+        'confidence': review_record['confidence'],
+        'timestamp': datetime.now().isoformat(),
+        'nearest_review': {
+            'review_id': review_record['nearest_review_id'],
+            'similarity': review_record['similarity_score']
+        },
+        'temporal_analysis': temporal_features,
+        'device_analytics': {
+            'device_id': review['device_id'],
+            'reviews_today': temporal_features['reviews_today'],
+            'reviews_this_week': temporal_features['reviews_this_week'],
+            'reviews_this_month': temporal_features['reviews_this_month']
+        },
+        'features_collected': {
+            'review_text': True,
+            'rating': review['rating'] is not None,
+            'category': bool(review['category']),
+            'device_tracking': bool(review['device_id']),
+            'temporal_analysis': True,
+            'sentiment': review_record['sentiment'],
+            'similarity_score': review_record['similarity_score'],
+            'lsa_score': review_record['lsa_score'],
+            'linguistic_features': review_record['linguistic_features'] is not None
+        },
+        'linguistic_features': review_record['linguistic_features']
+    }
+
+@app.route('/api/predict', methods=['POST'])
 
-        # Sentimental Analysis
-        from textblob import TextBlob
-        sentiment = TextBlob(review_text).sentiment.polarity
+def predict():
+    if serving is None:
+        return jsonify({'error': 'Model not loaded properly'}), 500
 
-        # Content Similarity (Cosine)
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        from sklearn.metrics.pairwise import cosine_similarity
-        tfidf_vectorizer = TfidfVectorizer(max_features=2000, min_df=3, max_df=0.6, stop_words='english')
-        tfidf_matrix = tfidf_vectorizer.fit_transform([review_text])
-        similarity_score = cosine_similarity(tfidf_matrix, tfidf_matrix)[0][0]
+    review, error = parse_review_input(request.get_json())
+    if error:
+        return jsonify({'error': error}), 400
 
-        # Latent Semantic Analysis (LSA)
-        from sklearn.decomposition import TruncatedSVD
-        lsa = TruncatedSVD(n_components=1, n_iter=100)
-        lsa.fit(tfidf_matrix)
-        lsa_score = lsa.explained_variance_ratio_[0]
+    try:
+        device_id = review['device_id']
 
         # Predict using loaded model
-        feats = np.array([sentiment, similarity_score, lsa_score]).reshape(1, -1)
-        prediction = model.predict(feats)[0]
-        probabilities = model.predict_proba(feats)[0]
-        result = 'Human Written' if prediction == 1 else 'AI Generated'
-
-        review_record = {
-            'id': str(uuid.uuid4()),
-            'review_preview': review_text[:100] + '...' if len(review_text) > 100 else review_text,
-            'prediction': result,
-            'confidence': float(max(probabilities)),
-            'rating': rating,
-            'category': category,
-            'device_id': device_id,
-            'timestamp': user_timestamp,
-            'temporal_features': temporal_features,
-            'analysis_timestamp': datetime.now().isoformat(),
-            'sentiment': sentiment,
-            'similarity_score': similarity_score,
-            'lsa_score': lsa_score
-        }
-        analytics_data['reviews'].append(review_record)
-        if device_id and device_id in analytics_data['devices']:
-            analytics_data['devices'][device_id]['last_seen'] = datetime.now().isoformat()
-            analytics_data['devices'][device_id]['total_reviews'] += 1
+        feats, labels, probabilities, neighbours, pending = predict_reviews([review])
+        result = labels[0]
+        temporal_features = record_predictions([review], labels)[0]
+        linguistic_features = extract_linguistic_features([review['review_text']])[0]
+
+        review_record = store_prediction(review, result, probabilities[0], feats[0], neighbours[0], temporal_features,
+                                         linguistic_features)
+        index_predictions([review], pending)
         logger.info(f"Prediction: {result}, Device: {device_id}, Temporal: {temporal_features}")
-        return jsonify({
-            'prediction': result,
-            'probabilities': probabilities.tolist(),
-            'confidence': float(max(probabilities)),
-            'timestamp': datetime.now().isoformat(),
-            'temporal_analysis': temporal_features,
-            'device_analytics': {
-                'device_id': device_id,
-                'reviews_today': temporal_features['reviews_today'],
-                'reviews_this_week': temporal_features['reviews_this_week'],
-                'reviews_this_month': temporal_features['reviews_this_month']
-            },
-            'features_collected': {
-                'review_text': True,
-                'rating': rating is not None,
-                'category': bool(category),
-                'device_tracking': bool(device_id),
-                'temporal_analysis': True,
-                'sentiment': sentiment,
-                'similarity_score': similarity_score,
-                'lsa_score': lsa_score
-            }
-        })
+        return jsonify(build_prediction_response(review, review_record, probabilities[0]))
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         return jsonify({'error': 'Prediction failed'}), 500
 
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score an array of reviews with one feature matrix and one model call"""
+    if serving is None:
+        return jsonify({'error': 'Model not loaded properly'}), 500
+
+    data = request.get_json(silent=True) or {}
+    items = data.get('reviews') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Provide a non-empty "reviews" array.'}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch too large. Maximum {MAX_BATCH_SIZE} reviews per request.'}), 400
+
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        review, error = parse_review_input(item)
+        if error:
+            results[index] = {'index': index, 'error': error}
+        else:
+            valid.append((index, review))
+
+    if valid:
+        reviews = [review for _, review in valid]
+        stored = 0
+        try:
+            feats, labels, probabilities, neighbours, pending = predict_reviews(reviews)
+            all_temporal_features = record_predictions(reviews, labels)
+            all_linguistic_features = extract_linguistic_features([review['review_text'] for review in reviews])
+            for row, (index, review) in enumerate(valid):
+                review_record = store_prediction(review, labels[row], probabilities[row], feats[row], neighbours[row],
+                                                 all_temporal_features[row], all_linguistic_features[row])
+                stored += 1
+                response = build_prediction_response(review, review_record, probabilities[row])
+                response['index'] = index
+                results[index] = response
+        except Exception as e:
+            logger.error(f"Batch prediction error: {e}")
+            return jsonify({'error': 'Prediction failed'}), 500
+        finally:
+            # Only reviews whose record was written join the index and the cache
+            if stored:
+                index_predictions(reviews[:stored], pending[:stored])
+
+    logger.info(f"Batch prediction: {len(valid)} scored, {len(items) - len(valid)} rejected")
+    return jsonify({
+        'results': results,
+        'processed': len(valid),
+        'failed': len(items) - len(valid)
+    })
+
+@app.route('/api/model/reload', methods=['POST'])
+def reload_model():
+    """Reload the model files from disk and drop cached predictions"""
+    if not load_model():
+        return jsonify({'error': 'Model reload failed'}), 500
+    return jsonify({'status': 'reloaded', 'model_version': serving.version})
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Get prediction cache hit/miss/eviction counters"""
+    return jsonify(dict(prediction_cache.stats(), model_version=serving.version if serving else None))
+
+@app.route('/api/batching/stats')
+def get_batching_stats():
+    """Get micro-batcher queue depth and batch size counters"""
+    return jsonify(scoring_batcher.stats())
+
+def parse_feedback_input(data):
+    """Validate a feedback payload, returning ((review id, class label), error message)"""
+    if not isinstance(data, dict):
+        return None, 'Invalid feedback payload.'
+    review_id = data.get('review_id')
+    label = data.get('label')
+    if not isinstance(review_id, str) or not review_id:
+        return None, 'No review_id provided.'
+    if label in (HUMAN_LABEL, 1) and label is not True:
+        label = 1
+    elif label in (FAKE_LABEL, 0) and label is not False:
+        label = 0
+    else:
+        return None, f'Label must be "{HUMAN_LABEL}" (or 1) or "{FAKE_LABEL}" (or 0).'
+    if not review_store.has_review(review_id):
+        return None, 'Review not found.'
+    return (review_id, label), None
+
+@app.route('/api/feedback', methods=['POST'])
+def submit_feedback():
+    """
+    Record ground-truth labels for stored reviews.
+
+    Accepts one {"review_id", "label"} object or {"feedback": [...]} with up
+    to MAX_BATCH_SIZE of them; with ONLINE_LEARNING set they are used to
+    retrain the model incrementally.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('feedback') if isinstance(data, dict) and 'feedback' in data else None
+    if items is None:
+        feedback, error = parse_feedback_input(data)
+        if error:
+            return jsonify({'error': error}), 404 if error == 'Review not found.' else 400
+        review_store.save_feedback(*feedback, datetime.now().isoformat())
+        return jsonify({'status': 'accepted', 'review_id': feedback[0], 'label': feedback[1]})
+
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'Provide a non-empty "feedback" array.'}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'Batch too large. Maximum {MAX_BATCH_SIZE} labels per request.'}), 400
+    received_at = datetime.now().isoformat()
+    results = []
+    for index, item in enumerate(items):
+        feedback, error = parse_feedback_input(item)
+        if error:
+            results.append({'index': index, 'error': error})
+        else:
+            review_store.save_feedback(*feedback, received_at)
+            results.append({'index': index, 'status': 'accepted', 'review_id': feedback[0], 'label': feedback[1]})
+    accepted = sum('error' not in result for result in results)
+    logger.info(f"Feedback: {accepted} accepted, {len(items) - accepted} rejected")
+    return jsonify({'results': results, 'accepted': accepted, 'failed': len(items) - accepted})
+
+@app.route('/api/online/stats')
+def get_online_stats():
+    """Get the online learner's training, holdout and serving model state"""
+    if online_learner is None:
+        return jsonify({'enabled': False, 'serving_version': serving.version if serving else None})
+    return jsonify(dict(online_learner.stats(), feedback_total=review_store.feedback_count()))
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Stage and request latency histograms and service counters in the Prometheus text format"""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/profile')
+def get_profile():
+    """Folded stacks sampled by the profiler (flamegraph.pl / speedscope input); ?reset=1 starts over"""
+    if profiler is None:
+        return jsonify({'error': 'Profiler disabled; set PROFILE_SAMPLE_INTERVAL_MS to enable it'}), 404
+    return Response(profiler.folded(reset=request.args.get('reset') == '1'), mimetype='text/plain')
+
 @app.route('/api/device/<device_id>/stats')
 def get_device_stats(device_id):
     """Get statistics for a specific device"""
-    if device_id not in analytics_data['devices']:
+    device_stats = analytics.device_stats(device_id)
+    if device_stats is None:
         return jsonify({'error': 'Device not found'}), 404
     
-    device_reviews = [r for r in analytics_data['reviews'] if r.get('device_id') == device_id]
-    
-    # Calculate temporal patterns
-    posting_hours = [r['temporal_features']['posting_hour'] for r in device_reviews]
-    posting_days = [r['temporal_features']['posting_day'] for r in device_reviews]
-    
     return jsonify({
         'device_id': device_id,
-        'total_reviews': len(device_reviews),
-        'first_seen': analytics_data['devices'][device_id]['created_at'],
-        'last_seen': analytics_data['devices'][device_id]['last_seen'],
+        'total_reviews': device_stats['total_reviews'],
+        'first_seen': device_stats['first_seen'],
+        'last_seen': device_stats['last_seen'],
         'posting_patterns': {
-            'common_hours': Counter(posting_hours).most_common(),
-            'common_days': Counter(posting_days).most_common(),
-            'avg_reviews_per_day': len(device_reviews) / max(1, len(set(
-                datetime.fromisoformat(r['timestamp'].replace('Z', '+00:00')).strftime('%Y-%m-%d')
-                for r in device_reviews
-            )))
+            'common_hours': device_stats['common_hours'],
+            'common_days': device_stats['common_days'],
+            'avg_reviews_per_day': device_stats['avg_reviews_per_day']
         },
-        'recent_activity': device_reviews[-10:]  # Last 10 reviews
+        'recent_activity': review_store.device_recent(device_id, 10)  # Last 10 reviews
     })
 
 @app.route('/api/temporal/patterns')
 def get_temporal_patterns():
     """Get overall temporal patterns across all reviews"""
-    if not analytics_data['reviews']:
+    patterns = analytics.temporal_patterns(datetime.now().astimezone(), FAKE_LABEL)
+    if patterns is None:
         return jsonify({'message': 'No data available'})
     
-    all_reviews = analytics_data['reviews']
-    
-    # Calculate patterns
-    posting_hours = [r['temporal_features']['posting_hour'] for r in all_reviews]
-    posting_days = [r['temporal_features']['posting_day'] for r in all_reviews]
-    predictions = [r['prediction'] for r in all_reviews]
-    
-    # Time-based prediction rates
-    hour_predictions = {}
-    for hour in range(24):
-        hour_reviews = [r for r in all_reviews if r['temporal_features']['posting_hour'] == hour]
-        if hour_reviews:
-            fake_count = len([r for r in hour_reviews if r['prediction'] == 'Computer generated'])
-            hour_predictions[hour] = {
-                'total_reviews': len(hour_reviews),
-                'fake_percentage': (fake_count / len(hour_reviews)) * 100
-            }
-    
-    return jsonify({
-        'total_reviews': len(all_reviews),
-        'hourly_distribution': Counter(posting_hours),
-        'daily_distribution': Counter(posting_days),
-        'prediction_by_hour': hour_predictions,
-        'recent_trends': {
-            'last_24_hours': len([r for r in all_reviews if 
-                                 datetime.now() - datetime.fromisoformat(
-                                     r['timestamp'].replace('Z', '+00:00')) < timedelta(hours=24)]),
-            'last_week': len([r for r in all_reviews if 
-                             datetime.now() - datetime.fromisoformat(
-                                 r['timestamp'].replace('Z', '+00:00')) < timedelta(days=7)])
-        }
-    })
+    return jsonify(patterns)
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # No reloader: its parent process would also build the app and, on exit,
+    # save its stale similarity index over the snapshot saved by the child
+    create_app().run(debug=True, use_reloader=False, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,129 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Groups concurrent model calls into one call per batch.
+
+    Callers submit a 2-D array of rows and block on the returned future. A
+    background thread takes the first waiting request, keeps collecting
+    requests until max_batch_size rows are queued or max_wait seconds have
+    passed, stacks them, calls handler once and hands each caller its slice
+    of the result. A request larger than max_batch_size is run on its own.
+    A request may name its own handler (e.g. the model that was serving
+    when its features were built); requests with different handlers are
+    stacked and called separately.
+
+    The thread is started on first use in each process, so an instance
+    created before a gunicorn fork works in every worker.
+    """
+
+    def __init__(self, handler, max_batch_size=64, max_wait=0.002):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Counter()
+
+    def submit(self, rows, handler=None):
+        """Queue rows for the next batch and return a Future for the handler's output on them"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((np.asarray(rows), future, handler or self.handler))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def __call__(self, rows, handler=None):
+        return self.submit(rows, handler).result()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    # A forked child inherits the queue but not the thread serving it
+                    self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        carry = None
+        while True:
+            batch = [carry if carry is not None else self._queue.get()]
+            carry = None
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if size + len(item[0]) > self.max_batch_size:
+                    # Leave it to start the next batch rather than overflow this one
+                    carry = item
+                    break
+                batch.append(item)
+                size += len(item[0])
+            self._process(batch)
+
+    def _process(self, batch):
+        groups = {}
+        for rows, future, handler in batch:
+            if future.set_running_or_notify_cancel():
+                groups.setdefault(handler, []).append((rows, future))
+        for handler, group in groups.items():
+            self._call(handler, group)
+
+    def _call(self, handler, batch):
+        sizes = [len(rows) for rows, _ in batch]
+        try:
+            outputs = handler(np.concatenate([rows for rows, _ in batch]))
+        except Exception as e:
+            self.errors += 1
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.requests += len(batch)
+        self.rows += sum(sizes)
+        self.batch_sizes[len(batch)] += 1
+        start = 0
+        for (rows, future), size in zip(batch, sizes):
+            future.set_result(outputs[start:start + size])
+            start += size
+
+    def stats(self):
+        return {
+            'queue_depth': self._queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self.batches,
+            'requests': self.requests,
+            'rows': self.rows,
+            'errors': self.errors,
+            'avg_requests_per_batch': self.requests / self.batches if self.batches else 0.0,
+            'avg_rows_per_batch': self.rows / self.batches if self.batches else 0.0,
+            'requests_per_batch': {str(size): count for size, count in sorted(self.batch_sizes.items())}
+        }
@@ -0,0 +1,337 @@
+"""
+API latency and throughput against analytics history size, checked against stored baselines.
+
+Usage (from the backend folder):
+    python benchmarks/bench_api.py                         # 1k to 1M reviews, Flask test client
+    python benchmarks/bench_api.py --target flask          # a local server started per history size
+    python benchmarks/bench_api.py --sizes 1000 100000 --check
+    python benchmarks/bench_api.py --save-baseline
+
+For each history size a review store is seeded with that many synthetic
+reviews from --devices registered devices, spread over the last 90 days,
+and the API is started on it, so it rebuilds its analytics from the store
+as after a restart. Then /api/predict, /api/predict/batch (with
+--batch-size reviews per request), /api/analytics/summary,
+/api/temporal/patterns and /api/device/<id>/stats each get --requests
+timed requests from --concurrency clients (after --warmup untimed ones),
+and p50/p99 latency and throughput are reported. Throughput is also given
+in reviews per second, and the batch endpoint's speedup over looping
+/api/predict is printed per history size.
+
+"client" runs the app in a fresh interpreter per size and calls it
+through Flask's test client, which leaves out HTTP. "flask" and "gunicorn"
+start a local server (app.py's development server, or gunicorn.conf.py)
+and send real HTTP requests. The model is a small engine export fitted on
+synthetic reviews (built once into --workdir) unless --engine names a real
+one, so runs are comparable between checkouts.
+
+--check compares the results with benchmarks/baselines/bench_api.json and
+exits with status 1 when a latency grew, or the throughput fell, by more
+than --tolerance (and latency by at least --min-delta-ms). Only results
+with the same target, endpoint and history size are compared; baselines
+are machine specific, so refresh them with --save-baseline on the machine
+that runs the check.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from storage import SCHEMA  # noqa: E402
+
+BASELINE_PATH = os.path.join(backend_dir, 'benchmarks', 'baselines', 'bench_api.json')
+ENDPOINTS = ['predict', 'predict_batch', 'analytics_summary', 'temporal_patterns', 'device_stats']
+WORDS = ('quality battery screen delivery price shoes fabric color size sound camera cable charger box packaging '
+         'fit comfort smell taste warranty good bad great poor nice awful decent okay solid cheap love hate '
+         'recommend return broke works perfectly disappointed amazing terrible').split()
+
+
+def synthetic_review(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 40))) + '.'
+
+
+def build_engine(path):
+    """Fit the feature pipeline and a logistic regression on synthetic reviews and export them to path"""
+    from sklearn.linear_model import LogisticRegression
+
+    from engine import export_engine
+    from features import ReviewFeatureExtractor
+
+    rng = random.Random(0)
+    texts = [synthetic_review(rng) for _ in range(2000)]
+    labels = [rng.randint(0, 1) for _ in texts]
+    extractor = ReviewFeatureExtractor(min_df=1, max_df=1.0).fit(texts)
+    model = LogisticRegression().fit(extractor.transform(texts), labels)
+    export_engine(extractor, model, path)
+
+
+def seed_store(path, size, devices, seed=0):
+    """Write size reviews from devices registered devices into a new SQLite review store; returns the device ids"""
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    device_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(devices)]
+    now = datetime.now().astimezone()
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.executemany(
+        'INSERT INTO devices (device_id, created_at, last_seen, total_reviews) VALUES (?, ?, ?, 0)',
+        [(device_id, (now - timedelta(days=90)).isoformat(), now.isoformat()) for device_id in device_ids])
+    rows = []
+    for i in range(size):
+        timestamp = (now - timedelta(seconds=rng.randrange(90 * 86400))).isoformat()
+        device_id = device_ids[i % devices]
+        prediction = 'AI Generated' if rng.random() < 0.3 else 'Human Written'
+        record = {'id': f'seed-{i}', 'review_preview': 'Seeded review', 'prediction': prediction,
+                  'device_id': device_id, 'timestamp': timestamp}
+        rows.append((record['id'], device_id, timestamp, prediction, json.dumps(record)))
+        if len(rows) == 100_000:
+            conn.executemany('INSERT INTO reviews (id, device_id, timestamp, prediction, record) VALUES (?, ?, ?, ?, ?)',
+                             rows)
+            rows = []
+    conn.executemany('INSERT INTO reviews (id, device_id, timestamp, prediction, record) VALUES (?, ?, ?, ?, ?)', rows)
+    conn.execute('UPDATE devices SET total_reviews = (SELECT COUNT(*) FROM reviews WHERE reviews.device_id = devices.device_id)')
+    conn.commit()
+    conn.close()
+    return device_ids
+
+
+def request_plan(device_ids, batch_size, seed=1):
+    """(endpoint name, method, path, JSON body factory, reviews per request) for each benchmarked endpoint"""
+    rng = random.Random(seed)
+
+    def predict_body():
+        return {'review': synthetic_review(rng), 'device_id': rng.choice(device_ids), 'rating': rng.randint(1, 5),
+                'timestamp': datetime.now().astimezone().isoformat()}
+
+    return [
+        ('predict', 'POST', '/api/predict', predict_body, 1),
+        ('predict_batch', 'POST', '/api/predict/batch',
+         lambda: {'reviews': [predict_body() for _ in range(batch_size)]}, batch_size),
+        ('analytics_summary', 'GET', '/api/analytics/summary', None, 1),
+        ('temporal_patterns', 'GET', '/api/temporal/patterns', None, 1),
+        ('device_stats', 'GET', None, lambda: rng.choice(device_ids), 1),
+    ]
+
+
+def drive(send, plan, requests, warmup, concurrency):
+    """Time requests through send(method, path, body) -> status; returns results keyed by endpoint"""
+    results = {}
+    for name, method, path, factory, reviews in plan:
+        def one():
+            if name == 'device_stats':
+                return send('GET', f'/api/device/{factory()}/stats', None)
+            return send(method, path, factory() if factory else None)
+
+        for _ in range(warmup):
+            one()
+        latencies = [[] for _ in range(concurrency)]
+        errors = [0] * concurrency
+        per_client = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+        def client(i):
+            for _ in range(per_client[i]):
+                start = time.perf_counter()
+                status = one()
+                latencies[i].append(time.perf_counter() - start)
+                errors[i] += status != 200
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        values = np.concatenate([np.array(v) for v in latencies]) * 1000
+        results[name] = {'p50_ms': float(np.percentile(values, 50)), 'p99_ms': float(np.percentile(values, 99)),
+                         'rps': len(values) / elapsed, 'reviews_per_s': len(values) * reviews / elapsed,
+                         'errors': sum(errors)}
+    return results
+
+
+def child_main(config):
+    """Run in a fresh interpreter: start the app on the seeded store and drive it through the test client"""
+    import app
+
+    client = app.create_app().test_client()
+
+    def send(method, path, body):
+        return client.open(path, method=method, json=body).status_code
+
+    results = drive(send, request_plan(config['device_ids'], config['batch_size']), config['requests'],
+                    config['warmup'], config['concurrency'])
+    print(json.dumps(results))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_server(target, env, device_ids, args):
+    port = free_port()
+    if target == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py']
+        env = dict(env, GUNICORN_BIND=f'127.0.0.1:{port}')
+    else:
+        command = [sys.executable, '-c',
+                   f"import app; app.create_app().run(host='127.0.0.1', port={port}, threaded=True)"]
+    server = subprocess.Popen(command, cwd=backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.monotonic() + 600
+        while True:
+            try:
+                with urllib.request.urlopen(base_url + '/api/health', timeout=5):
+                    break
+            except OSError:
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"{target} server did not start")
+                time.sleep(0.2)
+
+        def send(method, path, body):
+            data = json.dumps(body).encode() if body is not None else None
+            req = urllib.request.Request(base_url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+            try:
+                with urllib.request.urlopen(req, timeout=60) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        return drive(send, request_plan(device_ids, args.batch_size), args.requests, args.warmup, args.concurrency)
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def run_size(size, args, engine_path):
+    db_path = os.path.join(args.workdir, 'bench_api.db')
+    similarity_path = os.path.join(args.workdir, 'similarity_index.npz')
+    for path in (db_path + '-wal', db_path + '-shm', similarity_path):
+        if os.path.exists(path):
+            os.remove(path)
+    device_ids = seed_store(db_path, size, min(args.devices, size))
+    env = dict(os.environ, ANALYTICS_DB_PATH=db_path, SIMILARITY_INDEX_PATH=similarity_path, ENGINE_PATH=engine_path,
+               ONLINE_LEARNING='', PYTHONPATH=backend_dir)
+    if args.target != 'client':
+        return run_server(args.target, env, device_ids, args)
+
+    config = {'device_ids': device_ids, 'requests': args.requests, 'warmup': args.warmup,
+              'concurrency': args.concurrency, 'batch_size': args.batch_size}
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(config)],
+                         capture_output=True, text=True, cwd=backend_dir, env=env)
+    if out.returncode != 0:
+        raise RuntimeError(f"history size {size} failed:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def check(results, baselines, target, tolerance, min_delta_ms):
+    """Regressions of results against baselines, as readable strings"""
+    regressions = []
+    for key, current in results.items():
+        baseline = baselines.get(target, {}).get(key)
+        if baseline is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if (current[metric] > baseline[metric] * (1 + tolerance)
+                    and current[metric] - baseline[metric] >= min_delta_ms):
+                regressions.append(f"{key} {metric}: {current[metric]:.2f} ms vs baseline {baseline[metric]:.2f} ms")
+        if current['rps'] < baseline['rps'] / (1 + tolerance):
+            regressions.append(f"{key} rps: {current['rps']:.1f} vs baseline {baseline['rps']:.1f}")
+        if current['errors']:
+            regressions.append(f"{key}: {current['errors']} requests failed")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=['client', 'flask', 'gunicorn'], default='client')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10_000, 100_000, 1_000_000],
+                        help='Reviews in the analytics history')
+    parser.add_argument('--devices', type=int, default=1000, help='Registered devices the history is spread over')
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=1, help='Client threads')
+    parser.add_argument('--batch-size', type=int, default=100, help='Reviews per /api/predict/batch request')
+    parser.add_argument('--engine', help='Engine export to serve (default: a synthetic one built in --workdir)')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'fake-review-bench-api'))
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--check', action='store_true', help='Exit with status 1 on a regression')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='Allowed relative slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Ignore latency changes smaller than this')
+    parser.add_argument('--output', help='Also write the results as JSON')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(json.loads(args.child))
+        return
+
+    os.makedirs(args.workdir, exist_ok=True)
+    engine_path = args.engine
+    if engine_path is None:
+        engine_path = os.path.join(args.workdir, 'engine')
+        if not os.path.exists(os.path.join(engine_path, 'manifest.json')):
+            build_engine(engine_path)
+
+    results = {}
+    print(f"{'history':>9} {'endpoint':>18} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8} {'reviews/s':>10}")
+    for size in args.sizes:
+        size_results = run_size(size, args, engine_path)
+        for name, result in size_results.items():
+            results[f'{name}@{size}'] = result
+            print(f"{size:>9} {name:>18} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['rps']:>8.1f} "
+                  f"{result['reviews_per_s']:>10.1f}" + (f"  ({result['errors']} errors)" if result['errors'] else ''))
+        speedup = size_results['predict_batch']['reviews_per_s'] / size_results['predict']['reviews_per_s']
+        print(f"{size:>9} {'batch speedup':>18} {speedup:>8.1f}x reviews/s over /api/predict")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    if args.save_baseline:
+        baselines.setdefault(args.target, {}).update(
+            {key: {metric: round(value, 3) for metric, value in result.items() if metric != 'errors'}
+             for key, result in results.items()})
+        baselines['machine'] = {'python': platform.python_version(), 'platform': platform.platform(),
+                                'cpus': os.cpu_count(), 'saved_at': datetime.now().isoformat(timespec='seconds')}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+    if args.check:
+        regressions = check(results, baselines, args.target, args.tolerance, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
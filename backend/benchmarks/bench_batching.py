@@ -0,0 +1,83 @@
+"""
+Load test for the predict_proba micro-batcher: throughput and latency against max wait.
+
+Usage (from the backend folder):
+    python benchmarks/bench_batching.py --clients 1 8 32 --waits 0 0.5 2 5
+
+Each client thread scores single-review feature rows back to back, as
+/api/predict does. "direct" calls predict_proba once per request with no
+batcher; the other rows go through MicroBatcher with the given max wait.
+The default model is a logistic regression on the three serving features;
+--model can point at any pickled classifier with predict_proba instead.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batching import MicroBatcher  # noqa: E402
+
+
+def run_clients(score, clients, duration, n_features):
+    latencies = [[] for _ in range(clients)]
+    stop = time.monotonic() + duration
+
+    def client(out):
+        row = np.random.default_rng(len(out)).random((1, n_features))
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            score(row)
+            out.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(latencies[i],)) for i in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    latencies = np.concatenate([np.array(values) for values in latencies]) * 1000
+    return len(latencies) / elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--waits', type=float, nargs='+', default=[0, 0.5, 2, 5], help='Max wait in ms')
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=3.0, help='Seconds per configuration')
+    parser.add_argument('--model', help='Pickled classifier (default: logistic regression on 3 features)')
+    args = parser.parse_args()
+
+    if args.model:
+        model = joblib.load(args.model)
+    else:
+        rng = np.random.default_rng(0)
+        model = LogisticRegression().fit(rng.random((1000, 3)), rng.integers(0, 2, 1000))
+    n_features = model.n_features_in_
+
+    print(f"{'clients':>7} {'mode':>10} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'rows/batch':>10}")
+    for clients in args.clients:
+        configs = [('direct', None)] + [(f'wait {wait:g}ms', wait) for wait in args.waits]
+        for label, wait in configs:
+            if wait is None:
+                batcher = None
+                score = model.predict_proba
+            else:
+                batcher = MicroBatcher(model.predict_proba, max_batch_size=args.max_batch_size, max_wait=wait / 1000)
+                score = batcher
+            throughput, latencies = run_clients(score, clients, args.duration, n_features)
+            rows_per_batch = f"{batcher.stats()['avg_rows_per_batch']:.1f}" if batcher else '1.0'
+            print(f"{clients:>7} {label:>10} {throughput:>10.0f} {np.percentile(latencies, 50):>8.3f} "
+                  f"{np.percentile(latencies, 99):>8.3f} {rows_per_batch:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Measure near-duplicate query latency of the MinHash/LSH index against corpus size.
+
+Usage (from the backend folder):
+    python benchmarks/bench_similarity.py --sizes 10000 100000 1000000 5000000
+
+Synthetic reviews are drawn from a fixed vocabulary, and one in ten is a
+lightly edited copy of an earlier review. Half of the queries at each size
+are one-word edits of reviews already in the index, which exercise
+candidate lookup and signature verification; the other half are fresh
+reviews, which mostly take the no-match path. found is the share of
+near-duplicate queries matched to a review.
+
+The index is sized for the largest corpus up front. Up to 5M reviews it
+needs about 2 GB of memory and 15 minutes to fill on one CPU.
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similarity import MinHashLSH  # noqa: E402
+
+
+def edit(rng, vocabulary, text):
+    words = text.split()
+    words[int(rng.integers(len(words)))] = str(rng.choice(vocabulary))
+    return ' '.join(words)
+
+
+def synthetic_reviews(rng, vocabulary, count):
+    texts = []
+    for i in range(count):
+        if texts and i % 10 == 0:
+            texts.append(edit(rng, vocabulary, texts[int(rng.integers(len(texts)))]))
+        else:
+            texts.append(' '.join(rng.choice(vocabulary, int(rng.integers(8, 40)))))
+    return texts
+
+
+def time_queries(index, queries):
+    latencies = np.zeros(len(queries))
+    matched = 0
+    for i, text in enumerate(queries):
+        started = time.perf_counter()
+        _, score = index.query(text)
+        latencies[i] = time.perf_counter() - started
+        matched += score > 0
+    return latencies, matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 5_000_000])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--chunk', type=int, default=50_000, help='Reviews generated per insert chunk')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocabulary = np.array([''.join(rng.choice(list('abcdefghijklmnopqrstuvwxyz'), int(rng.integers(2, 10))))
+                           for _ in range(20_000)])
+    index = MinHashLSH(capacity=max(args.sizes))
+
+    # Indexed reviews that near-duplicate queries are edited from, sampled from every chunk
+    indexed_sample = []
+    print(f"{'corpus':>10} {'dup_p50_us':>11} {'dup_p99_us':>11} {'found':>6} "
+          f"{'new_p50_us':>11} {'new_p99_us':>11} {'matches':>8} {'index_mb':>10}")
+    for size in sorted(args.sizes):
+        while len(index) < size:
+            chunk = synthetic_reviews(rng, vocabulary, min(args.chunk, size - len(index)))
+            for text in chunk:
+                index.add(str(uuid.uuid4()), text)
+            picks = rng.choice(len(chunk), min(len(chunk), args.queries), replace=False)
+            indexed_sample.extend(chunk[i] for i in picks)
+        sources = rng.choice(len(indexed_sample), args.queries // 2)
+        duplicates = [edit(rng, vocabulary, indexed_sample[i]) for i in sources]
+        fresh = synthetic_reviews(rng, vocabulary, args.queries - len(duplicates))
+        dup_latencies, found = time_queries(index, duplicates)
+        new_latencies, matches = time_queries(index, fresh)
+        index_mb = sum(a.nbytes for a in (index.signatures, index.ids, index.seq, index.next, index.heads)) / 2 ** 20
+        dup_p50, dup_p99 = np.percentile(dup_latencies, [50, 99]) * 1e6
+        new_p50, new_p99 = np.percentile(new_latencies, [50, 99]) * 1e6
+        print(f"{size:>10} {dup_p50:>11.1f} {dup_p99:>11.1f} {found / len(duplicates):>6.1%} "
+              f"{new_p50:>11.1f} {new_p99:>11.1f} {matches:>8} {index_mb:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Cold start of the review model: the joblib pickles against the NumPy-only engine export.
+
+Usage (from the backend folder):
+    python engine.py
+    python benchmarks/bench_startup.py --repeat 5
+
+Each mode runs in a fresh interpreter, which imports what it needs, loads
+the model and scores one review, and reports the time to a loaded model,
+the time of the first prediction and the peak RSS. "pickles" unpickles
+TfidfModel1.pickle and feature_pipeline.pickle (scikit-learn, TextBlob,
+NLTK); "engine" loads the exported artifact with engine.Engine. "app" times
+importing app.py and load_model(), which picks the engine when one exists.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, os, resource, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {backend_dir!r})
+mode = {mode!r}
+if mode == 'pickles':
+    import joblib
+    model = joblib.load({model!r})
+    extractor = joblib.load({pipeline!r})
+elif mode == 'engine':
+    from engine import Engine
+    model = extractor = Engine({engine!r})
+else:
+    os.environ['ENGINE_PATH'] = {engine!r}
+    import app
+    app.load_model()
+    model, extractor = app.serving.model, app.serving.feature_extractor
+loaded = time.perf_counter()
+model.predict_proba(extractor.transform(['Great product, works exactly as described!'], similarity=[0.0]))
+predicted = time.perf_counter()
+print(json.dumps({{'load_s': loaded - start, 'first_prediction_ms': (predicted - loaded) * 1000,
+                  'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}}))
+"""
+
+
+def run(mode, args):
+    code = PROBE.format(backend_dir=backend_dir, mode=mode, model=args.model, pipeline=args.pipeline,
+                        engine=args.engine)
+    env = dict(os.environ, ANALYTICS_DB_PATH=os.devnull)
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=backend_dir, env=env)
+    if out.returncode != 0:
+        raise RuntimeError(f"{mode} failed:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=['pickles', 'engine', 'app'], default=['pickles', 'engine'])
+    parser.add_argument('--model', default=os.path.join(backend_dir, 'TfidfModel1.pickle'))
+    parser.add_argument('--pipeline', default=os.path.join(backend_dir, 'feature_pipeline.pickle'))
+    parser.add_argument('--engine', default=os.path.join(backend_dir, 'engine'))
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh interpreters per mode; medians are reported')
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'load s':>8} {'first ms':>9} {'RSS MB':>8}")
+    for mode in args.modes:
+        runs = [run(mode, args) for _ in range(args.repeat)]
+        medians = {key: float(np.median([r[key] for r in runs])) for key in runs[0]}
+        print(f"{mode:>8} {medians['load_s']:>8.2f} {medians['first_prediction_ms']:>9.1f} {medians['rss_mb']:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Insert synthetic reviews through the analytics write path and report RSS.
+
+Usage (from the backend folder):
+    python benchmarks/bench_store.py --count 10000000
+
+Memory should stay flat once the recent-records ring buffer is full: review
+records live in SQLite, and the in-memory indexes only grow with the number
+of distinct devices, days and hours.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import DeviceTimeIndex, ReviewAggregates  # noqa: E402
+from storage import ReviewStore  # noqa: E402
+
+
+def rss_mb():
+    """Current resident set size in MiB"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=10_000_000)
+    parser.add_argument('--devices', type=int, default=10_000)
+    parser.add_argument('--samples', type=int, default=20, help='Number of RSS measurements to report')
+    parser.add_argument('--db', default=None, help='SQLite path (defaults to a temporary file)')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'bench_analytics.db')
+    store = ReviewStore(db_path)
+    device_index = DeviceTimeIndex()
+    aggregates = ReviewAggregates()
+    devices = [str(uuid.uuid4()) for _ in range(args.devices)]
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    report_every = max(1, args.count // args.samples)
+
+    print(f"{'inserted':>12} {'rss_mb':>10} {'inserts/s':>12}")
+    began = time.perf_counter()
+    for i in range(args.count):
+        posted_at = start + timedelta(seconds=i * 7)
+        device_id = devices[i % len(devices)]
+        prediction = 'AI Generated' if i % 3 else 'Human Written'
+        record = {
+            'id': str(uuid.uuid4()),
+            'review_preview': f'Synthetic review number {i}',
+            'prediction': prediction,
+            'confidence': 0.5,
+            'device_id': device_id,
+            'timestamp': posted_at.isoformat(),
+            'temporal_features': {'posting_hour': posted_at.hour}
+        }
+        store.append(record)
+        device_index.add(device_id, posted_at)
+        aggregates.add(device_id, posted_at, prediction)
+        if (i + 1) % report_every == 0:
+            elapsed = time.perf_counter() - began
+            print(f"{i + 1:>12} {rss_mb():>10.1f} {(i + 1) / elapsed:>12.0f}")
+
+    store.close()
+    print(f"Stored {store.count()} reviews in {db_path}")
+
+
+if __name__ == '__main__':
+    main()
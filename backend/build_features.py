@@ -0,0 +1,89 @@
+"""
+Fit the review feature pipeline offline and save it next to the model.
+
+Usage (from the backend folder):
+    python build_features.py --data ../Data/Feature-Engineered/preprocessed_lemmatization_features.csv
+
+With --train-model the classifier is refitted on the extracted features and
+written to TfidfModel1.pickle. Either way the training texts are replayed
+through the serving path (the saved pipeline, one review per call, with
+similarity from a MinHash index queried and updated as the API does) and
+the result must match the features the classifier is fitted on, as must the
+classifier's probabilities when one was trained.
+"""
+import argparse
+import logging
+import os
+import uuid
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from features import FEATURE_NAMES, ReviewFeatureExtractor
+from similarity import MinHashLSH
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def served_similarities(texts):
+    """Similarity of each text as /api/predict computes it, posting the texts in order to an empty index"""
+    index = MinHashLSH(capacity=max(1024, len(texts)))
+    similarities = np.zeros(len(texts))
+    for i, text in enumerate(texts):
+        signature = index.signature(text)
+        (_, similarities[i]), = index.query_signatures([signature])
+        index.add_signatures([str(uuid.UUID(int=i))], [signature])
+    return similarities
+
+
+def check_parity(pipeline_path, texts, expected, model=None, sample_size=500):
+    """Confirm the serving path reproduces the training features (and model probabilities) for the training texts"""
+    loaded = joblib.load(pipeline_path)
+    similarities = served_similarities(texts)
+    sample = np.random.default_rng(0).choice(len(texts), min(sample_size, len(texts)), replace=False)
+    actual = np.vstack([loaded.transform([texts[i]], similarity=similarities[i:i + 1]) for i in sample])
+    if not np.allclose(actual, expected[sample]):
+        diff = np.abs(actual - expected[sample]).max(axis=0)
+        raise AssertionError(f"Serving features differ from training features (max diff per feature: "
+                             f"{dict(zip(FEATURE_NAMES, diff.round(6)))}): {pipeline_path}")
+    if model is not None and not np.allclose(model.predict_proba(actual), model.predict_proba(expected[sample])):
+        raise AssertionError("Classifier probabilities differ between serving and training features")
+    logger.info(f"Parity check passed on {len(sample)} reviews")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', required=True, help='CSV with the review text and label columns')
+    parser.add_argument('--text-column', default='processed_text')
+    parser.add_argument('--label-column', default='label')
+    parser.add_argument('--output', default=os.path.join(base_dir, 'feature_pipeline.pickle'))
+    parser.add_argument('--train-model', action='store_true',
+                        help='Also refit the classifier on the extracted features')
+    parser.add_argument('--model-output', default=os.path.join(base_dir, 'TfidfModel1.pickle'))
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    texts = df[args.text_column].fillna('').astype(str).tolist()
+
+    extractor = ReviewFeatureExtractor()
+    feats = extractor.fit_transform(texts)
+    joblib.dump(extractor, args.output)
+    logger.info(f"Feature pipeline saved: {args.output} ({', '.join(FEATURE_NAMES)})")
+
+    model = None
+    if args.train_model:
+        model = LogisticRegression(max_iter=1000)
+        model.fit(feats, df[args.label_column].values)
+        joblib.dump(model, args.model_output)
+        logger.info(f"Classifier saved: {args.model_output} (train accuracy {model.score(feats, df[args.label_column].values):.4f})")
+
+    check_parity(args.output, texts, feats, model)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Rough per-entry bookkeeping cost (key string, tuple and OrderedDict node)
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def normalize_review_text(review_text):
+    """Fold case and whitespace so trivially re-typed copies share a cache key"""
+    return ' '.join(review_text.casefold().split())
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of model outputs keyed by normalized review text.
+
+    Entries expire ttl seconds after they are stored and the cache is bounded
+    both by entry count and by an estimate of the bytes it holds. Keys include
+    the model version and any other model inputs that do not come from the
+    text itself; clear() is called whenever the model is reloaded.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=None, ttl=3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(review_text, model_version, *context):
+        normalized = normalize_review_text(review_text)
+        parts = [str(model_version), *(str(value) for value in context), normalized]
+        return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size=None):
+        """Store value under key, evicting least recently used entries past the bounds"""
+        if size is None:
+            size = sys.getsizeof(value)
+        size += ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self.bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or
+                                     (self.max_bytes and self.bytes > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,509 @@
+"""
+NumPy-only scoring of the review classifier from an exported, memory-mapped artifact.
+
+Usage (from the backend folder):
+    python engine.py --data ../Data/Feature-Engineered/preprocessed_lemmatization_features.csv
+    python engine.py --verify --data ../Data/Feature-Engineered/preprocessed_lemmatization_features.csv
+
+Exporting reads TfidfModel1.pickle and feature_pipeline.pickle and writes
+ENGINE_PATH (default: engine/): a manifest.json plus .npy arrays for the
+TF-IDF vocabulary (sorted 64-bit token hashes with their idf and LSA
+weights), the TextBlob sentiment lexicon and the classifier (logistic
+regression coefficients, or flattened decision tree arrays). Engine loads
+them with mmap_mode='r' and needs neither scikit-learn nor TextBlob/NLTK,
+which dominate the API's import time and memory.
+
+Either way the artifact is checked against the joblib pipeline and model on
+the texts in --data (or a few built-in reviews): features and probabilities
+must match to floating point tolerance and predicted labels exactly.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from metrics import stage
+from similarity import neighbour_similarities
+
+logger = logging.getLogger(__name__)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ENGINE_PATH = os.path.join(base_dir, 'engine')
+MANIFEST_NAME = 'manifest.json'
+FORMAT_VERSION = 1
+
+FEATURE_NAMES = ['sentiment', 'similarity_score', 'lsa_score']
+
+
+@lru_cache(maxsize=100_000)
+def token_hash(token: str) -> int:
+    """64-bit BLAKE2b hash of a token, the key of the vocabulary and lexicon tables"""
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def token_hashes(tokens) -> np.ndarray:
+    return np.fromiter((token_hash(token) for token in tokens), dtype=np.uint64, count=len(tokens))
+
+
+def lookup(table: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    """Position of each hash in a sorted hash table, or -1 when absent"""
+    if len(table) == 0:
+        return np.full(len(hashes), -1, dtype=np.int64)
+    positions = np.searchsorted(table, hashes)
+    positions[positions == len(table)] = 0
+    return np.where(table[positions] == hashes, positions, -1)
+
+
+# --- Sentiment ---------------------------------------------------------------
+# TextBlob's default PatternAnalyzer for plain strings (textblob/_text.py,
+# from the pattern library). The lexicon itself is exported into the
+# artifact; the tokenizer constants below are copied verbatim.
+
+PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+ABBREVIATIONS = {
+    "a.", "adj.", "adv.", "al.", "a.m.", "c.", "cf.", "comp.", "conf.", "def.", "ed.", "e.g.", "esp.", "etc.",
+    "ex.", "f.", "fig.", "gen.", "id.", "i.e.", "int.", "l.", "m.", "Med.", "Mil.", "Mr.", "n.", "n.q.",
+    "orig.", "pl.", "pred.", "pres.", "p.m.", "ref.", "v.", "vs.", "w/",
+}
+RE_ABBR1 = re.compile(r"^[A-Za-z]\.$")
+RE_ABBR2 = re.compile(r"^([A-Za-z]\.)+$")
+RE_ABBR3 = re.compile("^[A-Z][" + "|".join("bcdfghjklmnpqrstvwxz") + "]+.$")
+EMOTICONS = [  # (sentiment, expressions) in TextBlob's lookup order
+    (+1.00, ("<3", "♥")),
+    (+1.00, (">:D", ":-D", ":D", "=-D", "=D", "X-D", "x-D", "XD", "xD", "8-D")),
+    (+0.75, (">:P", ":-P", ":P", ":-p", ":p", ":-b", ":b", ":c)", ":o)", ":^)")),
+    (+0.50, (">:)", ":-)", ":)", "=)", "=]", ":]", ":}", ":>", ":3", "8)", "8-)")),
+    (+0.25, (">;]", ";-)", ";)", ";-]", ";]", ";D", ";^)", "*-)", "*)")),
+    (+0.05, (">:o", ":-O", ":O", ":o", ":-o", "o_O", "o.O", "°O°", "°o°")),
+    (-0.25, (">:/", ":-/", ":/", ":\\", ">:\\", ":-.", ":-s", ":s", ":S", ":-S", ">.>")),
+    (-0.75, (">:[", ":-(", ":(", "=(", ":-[", ":[", ":{", ":-<", ":c", ":-c", "=/")),
+    (-1.00, (":'(", ":'''(", ";'(")),
+]
+EMOTICON_POLARITY = {}
+for _polarity, _expressions in EMOTICONS:
+    for _expression in _expressions:
+        EMOTICON_POLARITY.setdefault(_expression.lower(), _polarity)
+RE_EMOTICONS = re.compile(r"(%s)($|\s)" % "|".join(
+    r" ?".join(re.escape(char) for char in expression) for _, expressions in EMOTICONS for expression in expressions))
+RE_SARCASM = re.compile(r"\( ?\! ?\)")
+REPLACEMENTS = {"'d": " 'd", "'m": " 'm", "'s": " 's", "'ll": " 'll", "'re": " 're", "'ve": " 've", "n't": " n't"}
+TOKEN = re.compile(r"(\S+)\s")
+EOS = "END-OF-SENTENCE"
+SENTENCE_END = ("...", ".", "!", "?", EOS)
+SENTENCE_TAIL = ("'", '"', "”", "’", "...", ".", "!", "?", ")", EOS)
+
+
+def find_tokens(string: str) -> list:
+    """TextBlob's tokenizer: sentences of space-separated tokens"""
+    punctuation = tuple(PUNCTUATION.replace(".", ""))
+    for a, b in REPLACEMENTS.items():
+        string = re.sub(a, b, string)
+    string = (string.replace("“", " “ ").replace("”", " ” ").replace("‘", " ‘ ").replace("’", " ’ ")
+              .replace("'", " ' ").replace('"', ' " '))
+    string = re.sub("\r\n", "\n", string)
+    string = re.sub(r"\n{2,}", " %s " % EOS, string)
+    string = re.sub(r"\s+", " ", string)
+    tokens = []
+    for t in TOKEN.findall(string + " "):
+        tail = []
+        while t.startswith(punctuation) and t not in REPLACEMENTS:
+            tokens.append(t[0])
+            t = t[1:]
+        while t.endswith(punctuation + (".",)) and t not in REPLACEMENTS:
+            if t.endswith(punctuation):
+                tail.append(t[-1])
+                t = t[:-1]
+            if t.endswith("..."):
+                tail.append("...")
+                t = t[:-3].rstrip(".")
+            if t.endswith("."):
+                if t in ABBREVIATIONS or RE_ABBR1.match(t) or RE_ABBR2.match(t) or RE_ABBR3.match(t):
+                    break
+                tail.append(t[-1])
+                t = t[:-1]
+        if t != "":
+            tokens.append(t)
+        tokens.extend(reversed(tail))
+    sentences, i, j = [[]], 0, 0
+    while j < len(tokens):
+        if tokens[j] in SENTENCE_END:
+            while j < len(tokens) and tokens[j] in SENTENCE_TAIL:
+                if tokens[j] in ("'", '"') and sentences[-1].count(tokens[j]) % 2 == 0:
+                    break
+                j += 1
+            sentences[-1].extend(t for t in tokens[i:j] if t != EOS)
+            sentences.append([])
+            i = j
+        j += 1
+    sentences[-1].extend(tokens[i:j])
+    sentences = (RE_SARCASM.sub("(!)", " ".join(s)) for s in sentences if len(s) > 0)
+    return [RE_EMOTICONS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), s) for s in sentences]
+
+
+class SentimentLexicon:
+    """TextBlob polarity from an exported lexicon of (polarity, subjectivity, intensity) scores."""
+
+    def __init__(self, hashes, scores, modifiers, negations):
+        self.hashes = hashes
+        self.scores = scores
+        self.modifiers = modifiers
+        self.negations = frozenset(negations)
+
+    def polarity(self, text: str) -> float:
+        words = [word.lower() for word in " ".join(find_tokens(text)).split()]
+        positions = lookup(self.hashes, token_hashes(words))
+        # Same state machine as textblob._text.Sentiment.assessments with pos=None
+        assessments = []
+        modifier = None
+        negation = None
+        for word, position in zip(words, positions.tolist()):
+            if position >= 0:
+                p, s, intensity = self.scores[position].tolist()
+                if modifier is None:
+                    assessments.append([p, s, intensity, 1])
+                else:
+                    last = assessments[-1]
+                    last[0] = max(-1.0, min(p * last[2], +1.0))
+                    last[1] = max(-1.0, min(s * last[2], +1.0))
+                    last[2] = intensity
+                if negation is not None:
+                    assessments[-1][2] = 1.0 / assessments[-1][2]
+                    assessments[-1][3] = -1
+                modifier = word if self.modifiers[position] else None
+                negation = word if word in self.negations else None
+            else:
+                if word in self.negations:
+                    negation = word
+                elif negation and len(word.strip("'")) > 1:
+                    negation = None
+                if negation is not None and modifier is not None and modifier.endswith("ly"):
+                    assessments[-1][3] = -1
+                    negation = None
+                elif modifier and len(word) > 2:
+                    modifier = None
+                if word == "!" and assessments:
+                    assessments[-1][0] = max(-1.0, min(assessments[-1][0] * 1.25, +1.0))
+                if word == "(!)":
+                    assessments.append([0.0, 1.0, 1.0, 1])
+                if word.isalpha() is False and len(word) <= 5 and word not in PUNCTUATION \
+                        and word in EMOTICON_POLARITY:
+                    assessments.append([EMOTICON_POLARITY[word], 1.0, 1.0, 1])
+        total = 0
+        for p, _, _, negated in assessments:
+            total += p * -0.5 if negated < 0 else p
+        return total / float(len(assessments) or 1)
+
+
+# --- Classifiers -------------------------------------------------------------
+
+class LinearScorer:
+    """Logistic regression predict_proba from its coefficients"""
+
+    def __init__(self, classes, coef, intercept):
+        self.classes_ = classes
+        self.coef = coef
+        self.intercept = intercept
+
+    def predict_proba(self, X):
+        decision = np.asarray(X, dtype=np.float64) @ self.coef.T + self.intercept
+        if self.coef.shape[0] == 1:
+            positive = 1.0 / (1.0 + np.exp(-decision[:, 0]))
+            return np.column_stack((1.0 - positive, positive))
+        decision = decision - decision.max(axis=1, keepdims=True)
+        np.exp(decision, out=decision)
+        return decision / decision.sum(axis=1, keepdims=True)
+
+
+class TreeScorer:
+    """
+    Decision tree / forest predict_proba over flattened node arrays.
+
+    Every (row, tree) pair descends one level per step, so the number of
+    NumPy operations grows with tree depth, not with rows or trees. Inputs
+    are compared as float32, as scikit-learn trees do.
+    """
+
+    def __init__(self, classes, roots, left, right, feature, threshold, value):
+        self.classes_ = classes
+        self.roots = roots
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.repeat(np.asarray(self.roots)[None, :], len(X), axis=0)
+        while True:
+            left = self.left[nodes]
+            internal = left >= 0
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(internal, np.where(go_left, left, self.right[nodes]), nodes)
+        return self.value[nodes].mean(axis=1)
+
+
+# --- Engine ------------------------------------------------------------------
+
+class Engine:
+    """
+    The review features (sentiment, similarity, LSA) and classifier, loaded from an exported artifact.
+
+    Provides the transform() of ReviewFeatureExtractor and the
+    predict_proba()/classes_ of the model, so the API can use it in place
+    of both pickles.
+    """
+
+    def __init__(self, path=DEFAULT_ENGINE_PATH):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        if self.manifest['format'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported engine format {self.manifest['format']} in {path}")
+        arrays = {name: np.load(os.path.join(path, file_name), mmap_mode='r')
+                  for name, file_name in self.manifest['arrays'].items()}
+
+        self.version = self.manifest['version']
+        self.token_pattern = re.compile(self.manifest['vectorizer']['token_pattern'])
+        self.vocabulary = arrays['vocabulary']
+        self.idf = arrays['idf']
+        self.lsa_component = arrays['lsa_component']
+        self.sentiment = SentimentLexicon(arrays['lexicon'], arrays['lexicon_scores'],
+                                          arrays['lexicon_modifiers'], self.manifest['sentiment']['negations'])
+
+        model = self.manifest['model']
+        if model['kind'] == 'linear':
+            self.model = LinearScorer(arrays['classes'], arrays['coef'], arrays['intercept'])
+        else:
+            self.model = TreeScorer(arrays['classes'], arrays['roots'], arrays['left'], arrays['right'],
+                                    arrays['feature'], arrays['threshold'], arrays['value'])
+        self.classes_ = self.model.classes_
+
+    def lsa_scores(self, texts) -> np.ndarray:
+        """Projection of each text's L2-normalized TF-IDF vector onto the LSA component"""
+        with stage('features.tfidf'):
+            row_ids, tokens = [], []
+            for i, text in enumerate(texts):
+                found = self.token_pattern.findall(text.lower())
+                tokens.extend(found)
+                row_ids.extend([i] * len(found))
+            positions = lookup(self.vocabulary, token_hashes(tokens))
+            known = positions >= 0
+            # Term counts per (row, vocabulary entry)
+            keys = np.asarray(row_ids, dtype=np.int64)[known] * len(self.vocabulary) + positions[known]
+            keys, counts = np.unique(keys, return_counts=True)
+            rows, columns = np.divmod(keys, len(self.vocabulary))
+            weights = counts * self.idf[columns]
+        with stage('features.lsa'):
+            norms = np.sqrt(np.bincount(rows, weights * weights, minlength=len(texts)))
+            projections = np.bincount(rows, weights * self.lsa_component[columns], minlength=len(texts))
+            return np.divide(projections, norms, out=np.zeros(len(texts)), where=norms > 0)
+
+    def transform(self, texts, similarity=None):
+        """Return an (n_reviews, 3) matrix of sentiment, similarity and LSA scores"""
+        texts = list(texts)
+        feats = np.empty((len(texts), len(FEATURE_NAMES)))
+        with stage('features.sentiment'):
+            feats[:, 0] = [self.sentiment.polarity(text) for text in texts]
+        feats[:, 1] = neighbour_similarities(texts) if similarity is None else similarity
+        feats[:, 2] = self.lsa_scores(texts)
+        return feats
+
+    def predict_proba(self, feats):
+        return self.model.predict_proba(feats)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(FEATURE_NAMES, dtype=object)
+
+
+def hash_table(words):
+    """Sorted hashes of words and the order that sorts them; raises on a hash collision"""
+    hashes = token_hashes(list(words))
+    order = np.argsort(hashes, kind='stable')
+    if len(np.unique(hashes)) != len(hashes):
+        raise ValueError("Token hash collision; cannot build the lookup table")
+    return hashes[order], order
+
+
+def vectorizer_arrays(extractor) -> tuple:
+    vectorizer = extractor.vectorizer_
+    params = vectorizer.get_params()
+    supported = {'analyzer': 'word', 'ngram_range': (1, 1), 'tokenizer': None, 'preprocessor': None,
+                 'strip_accents': None, 'lowercase': True, 'binary': False, 'norm': 'l2', 'use_idf': True,
+                 'sublinear_tf': False}
+    unsupported = {name: params[name] for name, value in supported.items() if params[name] != value}
+    if unsupported:
+        raise ValueError(f"Unsupported TF-IDF settings for export: {unsupported}")
+
+    words = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    hashes, order = hash_table(words)
+    config = {'token_pattern': vectorizer.token_pattern, 'vocabulary_size': len(words)}
+    arrays = {
+        'vocabulary': hashes,
+        'idf': np.asarray(vectorizer.idf_, dtype=np.float64)[order],
+        'lsa_component': np.asarray(extractor.lsa_.components_[0], dtype=np.float64)[order],
+    }
+    return config, arrays
+
+
+def sentiment_arrays() -> tuple:
+    from textblob.en import sentiment as lexicon
+    lexicon.load()
+    words = sorted(dict.keys(lexicon))
+    hashes, order = hash_table(words)
+    scores = np.array([dict.__getitem__(lexicon, word)[None] for word in words], dtype=np.float64)
+    modifiers = np.array([any(tag in dict.__getitem__(lexicon, word) for tag in lexicon.modifiers)
+                          for word in words])
+    config = {'negations': list(lexicon.negations), 'lexicon_size': len(words)}
+    return config, {'lexicon': hashes, 'lexicon_scores': scores[order], 'lexicon_modifiers': modifiers[order]}
+
+
+def model_arrays(model) -> tuple:
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.tree import DecisionTreeClassifier
+
+    classes = np.asarray(model.classes_)
+    if classes.dtype == object:
+        classes = classes.astype(str)
+    if isinstance(model, LogisticRegression):
+        return {'kind': 'linear'}, {'classes': classes, 'coef': np.asarray(model.coef_, dtype=np.float64),
+                                    'intercept': np.asarray(model.intercept_, dtype=np.float64)}
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier, DecisionTreeClassifier)):
+        trees = [model.tree_] if isinstance(model, DecisionTreeClassifier) else [e.tree_ for e in model.estimators_]
+        roots, left, right, feature, threshold, value = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            roots.append(offset)
+            is_leaf = tree.children_left < 0
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            leaf_value = tree.value[:, 0, :]
+            totals = leaf_value.sum(axis=1, keepdims=True)
+            value.append(leaf_value / np.where(totals == 0, 1.0, totals))
+            offset += tree.node_count
+        return {'kind': 'trees', 'n_trees': len(trees)}, {
+            'classes': classes,
+            'roots': np.asarray(roots, dtype=np.int32),
+            'left': np.concatenate(left).astype(np.int32),
+            'right': np.concatenate(right).astype(np.int32),
+            'feature': np.concatenate(feature).astype(np.int32),
+            'threshold': np.concatenate(threshold).astype(np.float64),
+            'value': np.concatenate(value).astype(np.float64),
+        }
+    raise ValueError(f"Unsupported model for export: {type(model).__name__}")
+
+
+def export_engine(extractor, model, path=DEFAULT_ENGINE_PATH, version=None):
+    """Write the artifact for a fitted ReviewFeatureExtractor and classifier; the manifest is replaced last"""
+    vectorizer_config, arrays = vectorizer_arrays(extractor)
+    sentiment_config, sentiment = sentiment_arrays()
+    model_config, model_data = model_arrays(model)
+    arrays.update(sentiment)
+    arrays.update(model_data)
+    if version is None:
+        digest = hashlib.blake2b(digest_size=6)
+        for name in sorted(arrays):
+            digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+        version = digest.hexdigest()
+
+    os.makedirs(path, exist_ok=True)
+    files = {}
+    for name, array in arrays.items():
+        file_name = f'{name}.{version}.npy'
+        tmp_path = os.path.join(path, file_name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(tmp_path, os.path.join(path, file_name))
+        files[name] = file_name
+
+    manifest = {'format': FORMAT_VERSION, 'version': version, 'created_at': datetime.now().isoformat(),
+                'features': FEATURE_NAMES, 'vectorizer': vectorizer_config, 'sentiment': sentiment_config,
+                'model': dict(model_config, type=type(model).__name__, n_features=int(model.n_features_in_)),
+                'arrays': files}
+    tmp_path = os.path.join(path, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_NAME))
+
+    referenced = set(files.values()) | {MANIFEST_NAME}
+    for file_name in os.listdir(path):
+        if file_name not in referenced and file_name.endswith(('.npy', '.tmp')):
+            os.remove(os.path.join(path, file_name))
+    return manifest
+
+
+def check_parity(engine, extractor, model, texts):
+    """Compare the engine with the joblib pipeline and model; raises AssertionError on a mismatch"""
+    similarity = neighbour_similarities(texts)
+    expected = extractor.transform(texts, similarity=similarity)
+    actual = engine.transform(texts, similarity=similarity)
+    expected_proba = model.predict_proba(expected)
+    actual_proba = engine.predict_proba(actual)
+    report = {
+        'texts': len(texts),
+        'max_feature_diff': {name: float(np.abs(actual[:, i] - expected[:, i]).max(initial=0))
+                             for i, name in enumerate(FEATURE_NAMES)},
+        'max_probability_diff': float(np.abs(actual_proba - expected_proba).max(initial=0)),
+        'label_mismatches': int((actual_proba.argmax(axis=1) != expected_proba.argmax(axis=1)).sum()),
+    }
+    logger.info(f"Parity: {json.dumps(report)}")
+    if not np.allclose(actual, expected, rtol=1e-9, atol=1e-12) or report['label_mismatches'] \
+            or not np.allclose(actual_proba, expected_proba, rtol=1e-9, atol=1e-12):
+        raise AssertionError(f"Engine does not reproduce the joblib model: {report}")
+    return report
+
+
+SAMPLE_REVIEWS = [
+    "This product is absolutely amazing!!! I love it :)",
+    "Not good. The battery died after two days and support never answered.",
+    "It's okay, I guess... not the best, not the worst (!)",
+    "Very very bad quality; would not recommend to anyone :(",
+    "Great value for money, fast shipping, really happy with the purchase.",
+    "",
+]
+
+
+def main():
+    # Only the export needs these; Engine itself does not
+    import joblib
+    import pandas as pd
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=os.path.join(base_dir, 'TfidfModel1.pickle'))
+    parser.add_argument('--pipeline', default=os.path.join(base_dir, 'feature_pipeline.pickle'))
+    parser.add_argument('--output', default=os.environ.get('ENGINE_PATH', DEFAULT_ENGINE_PATH))
+    parser.add_argument('--verify', action='store_true', help='Only check an existing artifact')
+    parser.add_argument('--data', help='CSV of review texts for the parity check')
+    parser.add_argument('--text-column', default='processed_text')
+    parser.add_argument('--sample-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    extractor = joblib.load(args.pipeline)
+    if not args.verify:
+        manifest = export_engine(extractor, model, args.output)
+        logger.info(f"Engine exported: {args.output} (version {manifest['version']}, {manifest['model']['type']})")
+
+    texts = list(SAMPLE_REVIEWS)
+    if args.data:
+        data = pd.read_csv(args.data, usecols=[args.text_column])[args.text_column].fillna('').astype(str)
+        texts += data.sample(min(args.sample_size, len(data)), random_state=0).tolist()
+    check_parity(Engine(args.output), extractor, model, texts)
+    logger.info(f"Parity check passed on {len(texts)} reviews")
+
+
+if __name__ == '__main__':
+    main()
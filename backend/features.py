@@ -0,0 +1,61 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from textblob import TextBlob
+
+from metrics import stage
+from similarity import neighbour_similarities
+
+FEATURE_NAMES = ['sentiment', 'similarity_score', 'lsa_score']
+
+
+class ReviewFeatureExtractor(BaseEstimator, TransformerMixin):
+    """
+    Sentiment, near-duplicate similarity and LSA features for the review classifier.
+
+    The TF-IDF vocabulary and the LSA projection are fitted once offline on
+    the training corpus (see build_features.py) and pickled next to the
+    model, so serving only calls transform.
+
+    The similarity feature is the estimated Jaccard similarity of a review to
+    its closest earlier review. At serving time it comes from the app's
+    MinHash index over stored reviews; when it is not supplied, each text is
+    compared with the texts before it in the same call, which is how the
+    training corpus is featurized.
+    """
+
+    def __init__(self, max_features=2000, min_df=3, max_df=0.6, n_iter=100, random_state=42):
+        self.max_features = max_features
+        self.min_df = min_df
+        self.max_df = max_df
+        self.n_iter = n_iter
+        self.random_state = random_state
+
+    def fit(self, texts, y=None):
+        self.vectorizer_ = TfidfVectorizer(max_features=self.max_features, min_df=self.min_df,
+                                           max_df=self.max_df, stop_words='english')
+        tfidf_matrix = self.vectorizer_.fit_transform(texts)
+        self.lsa_ = TruncatedSVD(n_components=1, n_iter=self.n_iter, random_state=self.random_state)
+        self.lsa_.fit(tfidf_matrix)
+        return self
+
+    def transform(self, texts, similarity=None):
+        """Return an (n_reviews, 3) matrix of sentiment, similarity and LSA scores"""
+        texts = list(texts)
+        with stage('features.tfidf'):
+            tfidf_matrix = self.vectorizer_.transform(texts)
+
+        feats = np.empty((len(texts), len(FEATURE_NAMES)))
+        # Sentimental Analysis
+        with stage('features.sentiment'):
+            feats[:, 0] = [TextBlob(text).sentiment.polarity for text in texts]
+        # Content Similarity (near-duplicate score against earlier reviews)
+        feats[:, 1] = neighbour_similarities(texts) if similarity is None else similarity
+        # Latent Semantic Analysis (LSA) projection onto the fitted component
+        with stage('features.lsa'):
+            feats[:, 2] = self.lsa_.transform(tfidf_matrix)[:, 0]
+        return feats
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(FEATURE_NAMES, dtype=object)
@@ -0,0 +1,58 @@
+"""
+Multi-worker serving: gunicorn -c gunicorn.conf.py (from the backend folder)
+
+The app and model are loaded once in the master and inherited copy-on-write
+by every worker. Analytics and the similarity index live in one analytics
+server process started here, so all workers share device registrations,
+counts and near-duplicate history; each worker opens its own SQLite
+connection for the review store.
+"""
+import gc
+import multiprocessing
+import os
+import secrets
+import tempfile
+
+wsgi_app = 'app:create_app(init_worker_state=False)'
+preload_app = True
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+_analytics_server = None
+
+
+def on_starting(server):
+    """Start the analytics server before any worker is forked"""
+    global _analytics_server
+    from analytics_server import start_server_process
+
+    address = os.environ.setdefault(
+        'ANALYTICS_SERVER_ADDRESS', os.path.join(tempfile.mkdtemp(prefix='fake-review-'), 'analytics.sock'))
+    authkey = os.environ.setdefault('ANALYTICS_SERVER_AUTHKEY', secrets.token_hex(16))
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    _analytics_server = start_server_process(
+        address, authkey.encode(),
+        os.environ.get('ANALYTICS_DB_PATH', os.path.join(base_dir, 'analytics.db')),
+        os.environ.get('SIMILARITY_INDEX_PATH', os.path.join(base_dir, 'similarity_index.npz')),
+        int(os.environ.get('SIMILARITY_INDEX_CAPACITY', 500_000)))
+    server.log.info(f"Analytics server started (pid {_analytics_server.pid}) at {address}")
+
+
+def when_ready(server):
+    # Move the preloaded model into the permanent generation so worker GC
+    # passes do not touch (and un-share) its pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import app
+    app.init_analytics()
+
+
+def on_exit(server):
+    if _analytics_server is not None and _analytics_server.poll() is None:
+        _analytics_server.terminate()
+        _analytics_server.wait(timeout=30)
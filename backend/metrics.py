@@ -0,0 +1,238 @@
+"""
+Per-stage latency histograms, counters and a sampling profiler for the API.
+
+Code under `with stage('name'):` is timed into the fake_review_stage_seconds
+histogram. REGISTRY renders every metric, plus values read from collectors
+at scrape time, in the Prometheus text format served at /api/metrics.
+Metrics are kept per process: under gunicorn each worker reports its own
+series, labelled with its pid.
+
+StackSampler is a statistical profiler. A background thread records the
+stack of every other thread every interval seconds and counts them as
+folded stacks ("frame;frame;frame count"), the input format of
+flamegraph.pl and speedscope.
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+
+# Seconds; from sub-millisecond stages to slow analytics requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels; by convention its name ends in _total"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, self.labelnames, labels, value
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observations (in seconds for latencies), with optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), then sum and count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        bucket_labelnames = self.labelnames + ('le',)
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield self.name + '_bucket', bucket_labelnames, labels + (format_value(bound),), cumulative
+            yield self.name + '_sum', self.labelnames, labels, total
+            yield self.name + '_count', self.labelnames, labels, count
+
+
+class Registry:
+    """
+    The metrics of one process.
+
+    Collectors are callables returning (name, kind, documentation,
+    [(labels dict, value), ...]) tuples; they expose state that is already
+    counted elsewhere (cache, micro-batcher, analytics) without a second copy.
+    """
+
+    def __init__(self, constant_labels=None):
+        self.constant_labels = constant_labels or {}
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        constant_names = tuple(self.constant_labels)
+        constant_values = tuple(self.constant_labels.values())
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labelnames, labels, value in metric.samples():
+                label_text = format_labels(constant_names + labelnames, constant_values + labels)
+                lines.append(f'{name}{label_text} {format_value(value)}')
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    label_text = format_labels(constant_names + tuple(labels), constant_values + tuple(labels.values()))
+                    lines.append(f'{name}{label_text} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry({'pid': os.getpid()})
+STAGE_SECONDS = REGISTRY.histogram('fake_review_stage_seconds', 'Time spent in each stage of request handling',
+                                   ('stage',))
+
+
+def stage(name):
+    """Context manager timing a block into the stage histogram"""
+    return STAGE_SECONDS.time(name)
+
+
+def reset_pid():
+    """Relabel the registry after a fork so each worker reports under its own pid"""
+    REGISTRY.constant_labels['pid'] = os.getpid()
+
+
+class StackSampler:
+    """
+    Statistical profiler: counts the folded stacks of all other threads every interval seconds.
+
+    Only frames from files under root (default: this folder) are kept, so
+    stacks read in terms of the app's own functions; frames in libraries
+    are collapsed into the nearest app frame that called them. Threads
+    blocked in a queue or condition wait, or in a server's select loop,
+    are idle and not counted.
+    """
+
+    def __init__(self, interval=0.01, root=None, max_stacks=10000):
+        self.interval = interval
+        self.root = root or os.path.dirname(os.path.abspath(__file__))
+        self.max_stacks = max_stacks
+        self.stacks = StackCounter()
+        self.samples = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def _fold(self, frame):
+        code = frame.f_code
+        if (code.co_name == 'wait' and code.co_filename == threading.__file__) or code.co_name == 'select':
+            return ''
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename.startswith(self.root):
+                names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            folded = [self._fold(frame) for ident, frame in sys._current_frames().items() if ident != own]
+            with self._lock:
+                for stack in folded:
+                    if not stack:
+                        continue
+                    if stack in self.stacks or len(self.stacks) < self.max_stacks:
+                        self.stacks[stack] += 1
+                    else:
+                        self.dropped += 1
+                self.samples += 1
+
+    def folded(self, reset=False):
+        """Sampled stacks in folded format, most frequent first"""
+        with self._lock:
+            stacks = self.stacks.most_common()
+            if reset:
+                self.stacks = StackCounter()
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
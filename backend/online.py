@@ -0,0 +1,389 @@
+"""
+Incremental retraining of the review classifier from labelled feedback.
+
+The online model stacks a logistic regression on top of the base model
+(the engine export or the pickles): its inputs are the base model's logit,
+the three review features and unigram/bigram counts hashed into a fixed
+number of columns, so no vocabulary has to be fitted and new spam wording
+is picked up as soon as it is labelled. It is trained with scikit-learn's
+SGDClassifier.partial_fit in mini-batches by FeedbackTrainer, and served
+with NumPy only by OnlineModel: transform() appends the hashed text score
+as a fourth column to the base features, predict_proba() combines it with
+the base model's output.
+
+A held-out slice of the feedback (chosen by review id) is never trained on.
+A candidate is published only when it beats the serving model on it; it is
+written to ONLINE_MODEL_PATH (arrays first, manifest replaced last) and every
+API process swaps it in when the manifest changes. Under gunicorn one worker
+holds the trainer lock and trains; the others only load what it publishes.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from engine import token_hashes
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = 'trainer.lock'
+FORMAT_VERSION = 1
+TOKEN_PATTERN = r'(?u)\b\w\w+\b'
+FEATURE_NAMES = ['sentiment', 'similarity_score', 'lsa_score', 'text_score']
+
+
+def hashed_terms(texts, n_features, token_pattern=re.compile(TOKEN_PATTERN)):
+    """
+    L2-normalized unigram and bigram counts hashed into n_features columns.
+
+    Returns COO arrays (rows, columns, values) with one entry per distinct
+    (text, column) pair.
+    """
+    row_ids, terms = [], []
+    for i, text in enumerate(texts):
+        tokens = token_pattern.findall(text.lower())
+        found = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+        terms.extend(found)
+        row_ids.extend([i] * len(found))
+    columns = (token_hashes(terms) % np.uint64(n_features)).astype(np.int64)
+    keys, counts = np.unique(np.asarray(row_ids, dtype=np.int64) * n_features + columns, return_counts=True)
+    rows, columns = np.divmod(keys, n_features)
+    norms = np.sqrt(np.bincount(rows, counts * counts, minlength=len(texts)))
+    return rows, columns, counts / norms[rows]
+
+
+def logit(p):
+    p = np.clip(p, 1e-6, 1 - 1e-6)
+    return np.log(p / (1 - p))
+
+
+def positive_proba(model, feats):
+    """Probability of class 1 (human written) under a base model"""
+    return model.predict_proba(feats)[:, list(model.classes_).index(1)]
+
+
+def log_loss(y, p):
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+class OnlineModel:
+    """
+    The base model plus a linear correction learned from feedback.
+
+    Serves as both feature extractor and model, like engine.Engine.
+    dense_coef weighs [base logit, sentiment, similarity, LSA] and text_coef
+    the hashed terms.
+    """
+
+    def __init__(self, base_model, base_extractor, base_version, dense_coef, text_coef, intercept, version,
+                 manifest=None):
+        self.base_model = base_model
+        self.base_extractor = base_extractor
+        self.base_version = base_version
+        self.dense_coef = np.asarray(dense_coef, dtype=np.float64)
+        self.text_coef = text_coef
+        self.intercept = float(intercept)
+        self.version = version
+        self.manifest = manifest or {}
+        self.n_features = len(text_coef)
+        self.classes_ = np.array([0, 1])
+
+    def text_scores(self, texts):
+        rows, columns, values = hashed_terms(texts, self.n_features)
+        return np.bincount(rows, values * self.text_coef[columns], minlength=len(texts))
+
+    def transform(self, texts, similarity=None):
+        """Return the base features with the hashed text score as a fourth column"""
+        texts = list(texts)
+        base = self.base_extractor.transform(texts, similarity=similarity)
+        with stage('features.text_hash'):
+            return np.column_stack((base, self.text_scores(texts)))
+
+    def predict_proba(self, feats):
+        feats = np.asarray(feats, dtype=np.float64)
+        base = feats[:, :3]
+        decision = (logit(positive_proba(self.base_model, base)) * self.dense_coef[0] + base @ self.dense_coef[1:]
+                    + feats[:, 3] + self.intercept)
+        positive = 1.0 / (1.0 + np.exp(-decision))
+        return np.column_stack((1.0 - positive, positive))
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(FEATURE_NAMES, dtype=object)
+
+    def save(self, path):
+        """Write the model's arrays and then its manifest, removing files of earlier versions"""
+        os.makedirs(path, exist_ok=True)
+        file_name = f'text_coef.{self.version}.npy'
+        tmp_path = os.path.join(path, file_name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(self.text_coef), allow_pickle=False)
+        os.replace(tmp_path, os.path.join(path, file_name))
+
+        manifest = dict(self.manifest, format=FORMAT_VERSION, version=self.version, base_version=self.base_version,
+                        created_at=datetime.now().isoformat(), token_pattern=TOKEN_PATTERN, ngram_range=[1, 2],
+                        n_features=self.n_features, dense_coef=self.dense_coef.tolist(), intercept=self.intercept,
+                        arrays={'text_coef': file_name})
+        tmp_path = os.path.join(path, MANIFEST_NAME + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(path, MANIFEST_NAME))
+        self.manifest = manifest
+
+        # Processes still serving an older version keep their mapping of the unlinked file
+        for name in os.listdir(path):
+            if name.endswith('.npy') and name != file_name:
+                os.remove(os.path.join(path, name))
+
+    @classmethod
+    def load(cls, path, base_model, base_extractor, base_version):
+        """The published model at path, or None when there is none for this base version"""
+        try:
+            with open(os.path.join(path, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        if manifest['format'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported online model format {manifest['format']} in {path}")
+        if manifest['base_version'] != base_version:
+            return None
+        text_coef = np.load(os.path.join(path, manifest['arrays']['text_coef']), mmap_mode='r')
+        return cls(base_model, base_extractor, base_version, manifest['dense_coef'], text_coef,
+                   manifest['intercept'], manifest['version'], manifest)
+
+
+class FeedbackTrainer:
+    """
+    Mini-batch SGD on the feedback log against one base model.
+
+    Every labelled review is either trained on or, when the hash of its id
+    falls in the first holdout_percent buckets, kept (up to holdout_size of
+    them) to compare the shadow model with the serving one.
+    """
+
+    def __init__(self, store, base, n_features=2 ** 18, batch_size=256, holdout_percent=20, holdout_size=2000,
+                 min_holdout=50, alpha=1e-5):
+        from sklearn.linear_model import SGDClassifier
+
+        self.store = store
+        self.base_model, self.base_extractor, self.base_version = base
+        self.n_features = n_features
+        self.batch_size = batch_size
+        self.holdout_percent = holdout_percent
+        self.min_holdout = min_holdout
+        self.holdout_size = holdout_size
+        self.classifier = SGDClassifier(loss='log_loss', alpha=alpha)
+        self.holdout = OrderedDict()
+        self.last_rowid = 0
+        self.trained = 0
+        self.skipped = 0
+        self.updates = 0
+        self.published = 0
+        self.last_check = None
+        self.train_seconds = 0.0
+
+    def is_holdout(self, review_id):
+        digest = hashlib.blake2b(review_id.encode('utf-8'), digest_size=4).digest()
+        return int.from_bytes(digest, 'little') % 100 < self.holdout_percent
+
+    def design_matrix(self, texts, similarities):
+        """Sparse training rows: [base logit, base features, hashed terms]"""
+        from scipy import sparse
+
+        base = self.base_extractor.transform(texts, similarity=similarities)
+        dense = np.column_stack((logit(positive_proba(self.base_model, base)), base))
+        rows, columns, values = hashed_terms(texts, self.n_features)
+        terms = sparse.csr_matrix((values, (rows, columns)), shape=(len(texts), self.n_features))
+        return sparse.hstack([sparse.csr_matrix(dense), terms], format='csr')
+
+    def step(self):
+        """Train on feedback logged since the last step; returns the number of new labelled reviews"""
+        new = 0
+        start = time.process_time()
+        while True:
+            rows = self.store.feedback_since(self.last_rowid, self.batch_size)
+            if not rows:
+                break
+            self.last_rowid = rows[-1][0]
+            new += len(rows)
+            batch = []
+            for _, review_id, label, review_text, similarity in rows:
+                if not review_text:
+                    self.skipped += 1
+                elif self.is_holdout(review_id):
+                    self.holdout.pop(review_id, None)
+                    self.holdout[review_id] = (review_text, similarity, label)
+                    if len(self.holdout) > self.holdout_size:
+                        self.holdout.popitem(last=False)
+                else:
+                    batch.append((review_text, similarity, label))
+            if batch:
+                texts, similarities, labels = zip(*batch)
+                self.classifier.partial_fit(self.design_matrix(list(texts), np.array(similarities)),
+                                            np.array(labels), classes=[0, 1])
+                self.trained += len(batch)
+                self.updates += 1
+            if len(rows) < self.batch_size:
+                break
+        self.train_seconds += time.process_time() - start
+        return new
+
+    def shadow(self):
+        """The current SGD weights as a servable OnlineModel, or None before the first update"""
+        if not self.updates:
+            return None
+        coef = self.classifier.coef_[0]
+        digest = hashlib.blake2b(coef.tobytes(), digest_size=6).hexdigest()
+        return OnlineModel(self.base_model, self.base_extractor, self.base_version, coef[:4], coef[4:].copy(),
+                           self.classifier.intercept_[0], f'{self.base_version}.online-{digest}',
+                           {'trained_reviews': self.trained, 'holdout_reviews': len(self.holdout)})
+
+    def evaluate(self, model, extractor):
+        texts, similarities, labels = zip(*self.holdout.values())
+        labels = np.array(labels)
+        p = positive_proba(model, extractor.transform(list(texts), similarity=np.array(similarities)))
+        return {'accuracy': float(np.mean((p >= 0.5) == (labels == 1))), 'log_loss': log_loss(labels, p)}
+
+    def check(self, serving):
+        """
+        Compare the shadow model with the serving (model, extractor, version) on the holdout.
+
+        Returns the shadow model when it should replace the serving one: it
+        needs min_holdout held-out reviews, a lower log loss and no lower accuracy.
+        """
+        candidate = self.shadow()
+        if candidate is None or len(self.holdout) < self.min_holdout:
+            return None
+        shadow_metrics = self.evaluate(candidate, candidate)
+        serving_metrics = self.evaluate(*serving[:2])
+        self.last_check = {'at': datetime.now().isoformat(), 'holdout_reviews': len(self.holdout),
+                           'shadow': shadow_metrics, 'serving': serving_metrics}
+        if (shadow_metrics['log_loss'] < serving_metrics['log_loss']
+                and shadow_metrics['accuracy'] >= serving_metrics['accuracy']):
+            candidate.manifest['holdout'] = self.last_check
+            return candidate
+        return None
+
+    def stats(self):
+        return {
+            'base_version': self.base_version,
+            'feedback_seen': self.last_rowid,
+            'trained_reviews': self.trained,
+            'holdout_reviews': len(self.holdout),
+            'skipped_without_text': self.skipped,
+            'updates': self.updates,
+            'published': self.published,
+            'train_cpu_seconds': round(self.train_seconds, 3),
+            'last_check': self.last_check
+        }
+
+
+class OnlineLearner:
+    """
+    Per-process loop that trains (when it holds the trainer lock) and loads published models.
+
+    get_base() and get_serving() return the (model, extractor, version) of
+    the base model and of the one currently serving, and swap(model)
+    installs a new OnlineModel; all three are supplied by the app.
+    """
+
+    def __init__(self, store, path, get_base, get_serving, swap, poll_interval=5.0, **trainer_options):
+        self.store = store
+        self.path = path
+        self.get_base = get_base
+        self.get_serving = get_serving
+        self.swap = swap
+        self.poll_interval = poll_interval
+        self.trainer_options = trainer_options
+        self.trainer = None
+        self.errors = 0
+        self._lock_file = None
+        self._manifest_mtime = None
+        self._thread = threading.Thread(target=self._run, name='online-learner', daemon=True)
+
+    def start(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._thread.start()
+        return self
+
+    def reset(self):
+        """Forget the published model already seen, e.g. after the base model was reloaded"""
+        self._manifest_mtime = None
+
+    def _acquire_trainer_lock(self):
+        if self._lock_file is None:
+            lock_file = open(os.path.join(self.path, LOCK_NAME), 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+            logger.info(f"Process {os.getpid()} is the online trainer")
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Online learning error: {e}")
+            time.sleep(self.poll_interval)
+
+    def tick(self):
+        base = self.get_base()
+        if base is None:
+            return
+        if self._acquire_trainer_lock():
+            self.train(base)
+        self.load_published(base)
+
+    def train(self, base):
+        if self.trainer is None or self.trainer.base_version != base[2]:
+            # A new base model starts the feedback log over
+            self.trainer = FeedbackTrainer(self.store, base, **self.trainer_options)
+        if self.trainer.step():
+            candidate = self.trainer.check(self.get_serving())
+            if candidate is not None:
+                candidate.save(self.path)
+                self.trainer.published += 1
+                self._manifest_mtime = os.stat(os.path.join(self.path, MANIFEST_NAME)).st_mtime_ns
+                self.swap(candidate)
+                logger.info(f"Published online model {candidate.version} "
+                            f"(holdout log loss {self.trainer.last_check['shadow']['log_loss']:.4f}, "
+                            f"serving {self.trainer.last_check['serving']['log_loss']:.4f})")
+
+    def load_published(self, base):
+        try:
+            mtime = os.stat(os.path.join(self.path, MANIFEST_NAME)).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+        model = OnlineModel.load(self.path, *base)
+        self._manifest_mtime = mtime
+        if model is not None and model.version != self.get_serving()[2]:
+            self.swap(model)
+            logger.info(f"Loaded online model {model.version}")
+
+    def stats(self):
+        serving = self.get_serving()
+        return {
+            'enabled': True,
+            'pid': os.getpid(),
+            'trainer': self._lock_file is not None,
+            'serving_version': serving[2] if serving else None,
+            'errors': self.errors,
+            'training': self.trainer.stats() if self.trainer else None
+        }
@@ -0,0 +1,268 @@
+import threading
+import uuid
+
+import numpy as np
+
+# Polynomial base for the rolling shingle hash and the splitmix64 finalizer constants
+_SHINGLE_BASE = np.uint64(1099511628211)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(h):
+    h = h ^ (h >> np.uint64(30))
+    h = h * _MIX_1
+    h = h ^ (h >> np.uint64(27))
+    h = h * _MIX_2
+    return h ^ (h >> np.uint64(31))
+
+
+class MinHasher:
+    """MinHash signatures over the character n-gram shingles of normalized review text"""
+
+    def __init__(self, num_perm=64, shingle_size=5, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._perm_a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._perm_b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    def params(self):
+        return {'num_perm': self.num_perm, 'shingle_size': self.shingle_size, 'seed': self.seed}
+
+    def signature(self, text):
+        """Return the MinHash signature of a review, or None if it has no content"""
+        data = ' '.join(text.casefold().split()).encode('utf-8')
+        if not data:
+            return None
+        values = np.frombuffer(data, dtype=np.uint8).astype(np.uint64)
+        k = min(self.shingle_size, len(values))
+        n = len(values) - k + 1
+        shingles = np.zeros(n, dtype=np.uint64)
+        for offset in range(k):
+            shingles = shingles * _SHINGLE_BASE + values[offset:offset + n]
+        shingles = np.unique(_mix(shingles))
+        # Multiply-shift hashing: the top 16 bits of a*x + b for each permutation
+        hashed = (self._perm_a[:, None] * shingles[None, :] + self._perm_b[:, None]) >> np.uint64(48)
+        return hashed.min(axis=1).astype(np.uint16)
+
+
+class MinHashLSH:
+    """
+    Near-duplicate index over review text using MinHash signatures and LSH banding.
+
+    Reviews are shingled into overlapping character n-grams of their
+    normalized text and summarised by a num_perm-value MinHash signature,
+    stored as 16-bit values in arrays that grow up to capacity rows. Each band of the
+    signature is hashed into a direct-mapped table whose slots head a chain
+    of reviews (newest first) linked through a per-band next array, so a
+    query only inspects reviews that share at least one band.
+
+    The index holds at most capacity reviews. Once full, the oldest review is
+    overwritten; chains are cut lazily at the first overwritten entry.
+    """
+
+    def __init__(self, num_perm=64, bands=16, shingle_size=5, capacity=500_000,
+                 max_chain=64, seed=1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.rows = num_perm // bands
+        if self.rows > 4:
+            raise ValueError('At most 4 signature rows per band are supported')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.capacity = capacity
+        self.max_chain = max_chain
+        self.seed = seed
+        self.table_bits = max(10, int(np.ceil(np.log2(capacity))))
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, seed=seed)
+
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint16)
+        self.ids = np.zeros((0, 16), dtype=np.uint8)
+        self.seq = np.zeros(0, dtype=np.int64)
+        self.next = np.zeros((0, bands), dtype=np.int32)
+        self.heads = np.full((bands, 1 << self.table_bits), -1, dtype=np.int32)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def signature(self, text):
+        """Return the MinHash signature of a review, or None if it has no content"""
+        return self.hasher.signature(text)
+
+    def hasher_params(self):
+        """Parameters for building a MinHasher that produces signatures compatible with this index"""
+        return self.hasher.params()
+
+    def _band_slots(self, signature):
+        packed = np.zeros(self.bands, dtype=np.uint64)
+        for row in signature.reshape(self.bands, self.rows).astype(np.uint64).T:
+            packed = (packed << np.uint64(16)) | row
+        packed = _mix(packed + np.arange(self.bands, dtype=np.uint64) * _GOLDEN)
+        return (packed >> np.uint64(64 - self.table_bits)).astype(np.int64)
+
+    def _candidates(self, band_slots):
+        candidates = set()
+        for band, table_slot in enumerate(band_slots):
+            slot = int(self.heads[band, table_slot])
+            steps = 0
+            while slot >= 0 and steps < self.max_chain:
+                candidates.add(slot)
+                previous = int(self.next[slot, band])
+                # Chains run newest to oldest; a non-decreasing seq means the
+                # older entry has since been overwritten, ending the chain
+                if previous < 0 or self.seq[previous] >= self.seq[slot]:
+                    break
+                slot = previous
+                steps += 1
+        return candidates
+
+    def _query(self, signature, band_slots):
+        candidates = self._candidates(band_slots)
+        if not candidates:
+            return None, 0.0
+        slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        scores = (self.signatures[slots] == signature).mean(axis=1)
+        best = int(scores.argmax())
+        if scores[best] * self.num_perm < self.rows:
+            # Only reachable through a table collision, not a shared band
+            return None, 0.0
+        return str(uuid.UUID(bytes=self.ids[slots[best]].tobytes())), float(scores[best])
+
+    def _add(self, review_id, signature, band_slots):
+        slot = self.count % self.capacity
+        if slot >= len(self.signatures):
+            self._grow()
+        self.signatures[slot] = signature
+        self.ids[slot] = np.frombuffer(uuid.UUID(review_id).bytes, dtype=np.uint8)
+        self.seq[slot] = self.count
+        bands = np.arange(self.bands)
+        self.next[slot] = self.heads[bands, band_slots]
+        self.heads[bands, band_slots] = slot
+        self.count += 1
+
+    def _grow(self):
+        size = min(self.capacity, max(1024, 2 * len(self.signatures)))
+        extra = size - len(self.signatures)
+        self.signatures = np.concatenate([self.signatures, np.zeros((extra, self.num_perm), dtype=np.uint16)])
+        self.ids = np.concatenate([self.ids, np.zeros((extra, 16), dtype=np.uint8)])
+        self.seq = np.concatenate([self.seq, np.zeros(extra, dtype=np.int64)])
+        self.next = np.concatenate([self.next, np.full((extra, self.bands), -1, dtype=np.int32)])
+
+    def query(self, text):
+        """Return (review_id, estimated Jaccard similarity) of the closest indexed review"""
+        signature = self.signature(text)
+        if signature is None:
+            return None, 0.0
+        with self._lock:
+            return self._query(signature, self._band_slots(signature))
+
+    def add(self, review_id, text):
+        """Index a review under its UUID string"""
+        signature = self.signature(text)
+        if signature is not None:
+            with self._lock:
+                self._add(review_id, signature, self._band_slots(signature))
+
+    def query_and_add(self, review_id, text):
+        """Find the closest previously indexed review, then index this one"""
+        return self.query_and_add_signature(review_id, self.signature(text))
+
+    def query_and_add_signature(self, review_id, signature):
+        """query_and_add for a signature computed elsewhere, e.g. by a worker process"""
+        if signature is None:
+            return None, 0.0
+        band_slots = self._band_slots(signature)
+        with self._lock:
+            neighbour = self._query(signature, band_slots)
+            self._add(review_id, signature, band_slots)
+        return neighbour
+
+    def query_and_add_signatures(self, review_ids, signatures):
+        """query_and_add_signature for a list of reviews, in order, under one lock"""
+        band_slots = [None if signature is None else self._band_slots(signature) for signature in signatures]
+        neighbours = []
+        with self._lock:
+            for review_id, signature, slots in zip(review_ids, signatures, band_slots):
+                if signature is None:
+                    neighbours.append((None, 0.0))
+                    continue
+                neighbours.append(self._query(signature, slots))
+                self._add(review_id, signature, slots)
+        return neighbours
+
+    def query_signatures(self, signatures):
+        """
+        Closest review for each signature, among indexed reviews and earlier signatures in the list.
+
+        Earlier entries in the list are returned by their position (an int)
+        rather than a review id. Nothing is indexed; see add_signatures.
+        """
+        band_slots = [None if signature is None else self._band_slots(signature) for signature in signatures]
+        with self._lock:
+            neighbours = [(None, 0.0) if signature is None else self._query(signature, slots)
+                          for signature, slots in zip(signatures, band_slots)]
+        present = [i for i, signature in enumerate(signatures) if signature is not None]
+        if len(present) > 1:
+            stacked = np.stack([signatures[i] for i in present])
+            slots = np.stack([band_slots[i] for i in present])
+            for k in range(1, len(present)):
+                # Earlier reviews in the list are candidates when they share a band, as in the index
+                shared = np.flatnonzero((slots[:k] == slots[k]).any(axis=1))
+                if not len(shared):
+                    continue
+                scores = (stacked[shared] == stacked[k]).mean(axis=1)
+                best = int(scores.argmax())
+                i = present[k]
+                if scores[best] > neighbours[i][1] and scores[best] * self.num_perm >= self.rows:
+                    neighbours[i] = (present[shared[best]], float(scores[best]))
+        return neighbours
+
+    def add_signatures(self, review_ids, signatures):
+        """Index reviews whose signatures were computed elsewhere, e.g. by a worker process"""
+        band_slots = [None if signature is None else self._band_slots(signature) for signature in signatures]
+        with self._lock:
+            for review_id, signature, slots in zip(review_ids, signatures, band_slots):
+                if signature is not None:
+                    self._add(review_id, signature, slots)
+
+    def save(self, path):
+        """Write a snapshot of the index to an .npz file"""
+        with self._lock:
+            used = min(self.count, len(self.signatures))
+            # Most table slots are empty until the index fills, so store heads sparsely
+            head_positions = np.flatnonzero(self.heads >= 0)
+            np.savez(path, signatures=self.signatures[:used], ids=self.ids[:used], seq=self.seq[:used],
+                     next=self.next[:used], head_positions=head_positions,
+                     head_values=self.heads.ravel()[head_positions],
+                     params=np.array([self.num_perm, self.bands, self.shingle_size, self.capacity,
+                                      self.max_chain, self.seed, self.count], dtype=np.int64))
+
+    @classmethod
+    def load(cls, path):
+        """Restore an index saved with save()"""
+        with np.load(path) as snapshot:
+            num_perm, bands, shingle_size, capacity, max_chain, seed, count = (int(v) for v in snapshot['params'])
+            index = cls(num_perm=num_perm, bands=bands, shingle_size=shingle_size, capacity=capacity,
+                        max_chain=max_chain, seed=seed)
+            index.signatures = snapshot['signatures']
+            index.ids = snapshot['ids']
+            index.seq = snapshot['seq']
+            index.next = snapshot['next']
+            index.heads.ravel()[snapshot['head_positions']] = snapshot['head_values']
+            index.count = count
+        return index
+
+
+def neighbour_similarities(texts, index=None):
+    """Similarity of each text to its closest predecessor, as seen by the serving index"""
+    index = index or MinHashLSH(capacity=max(1024, len(texts)))
+    similarities = np.zeros(len(texts))
+    for i, text in enumerate(texts):
+        _, similarities[i] = index.query_and_add(str(uuid.UUID(int=i)), text)
+    return similarities
@@ -0,0 +1,198 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id TEXT PRIMARY KEY,
+    device_id TEXT,
+    timestamp TEXT,
+    prediction TEXT,
+    record TEXT NOT NULL,
+    review_text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_device_id ON reviews (device_id);
+CREATE INDEX IF NOT EXISTS idx_reviews_timestamp ON reviews (timestamp);
+CREATE TABLE IF NOT EXISTS devices (
+    device_id TEXT PRIMARY KEY,
+    created_at TEXT,
+    last_seen TEXT,
+    total_reviews INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS feedback (
+    review_id TEXT PRIMARY KEY,
+    label INTEGER NOT NULL,
+    received_at TEXT NOT NULL
+);
+"""
+
+_STOP = object()
+
+
+class ReviewStore:
+    """
+    Durable review log backed by SQLite in WAL mode.
+
+    Writes are queued and committed in batches by a background thread so the
+    request path never waits on disk I/O. Only the most recent records are
+    kept in memory, in a ring buffer of recent_limit entries.
+    """
+
+    def __init__(self, path, recent_limit=1000, batch_size=500, flush_interval=0.5, max_pending=10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recent = deque(maxlen=recent_limit)
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(reviews)')}
+        if 'review_text' not in columns:
+            # Stores created before review texts were kept for retraining
+            conn.execute('ALTER TABLE reviews ADD COLUMN review_text TEXT')
+
+        self._writer = threading.Thread(target=self._write_loop, name='review-store-writer', daemon=True)
+        self._writer.start()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def append(self, record, review_text=None):
+        """Queue a review record (and optionally its full text) for persistence; blocks only if the writer falls far behind"""
+        self.recent.append(record)
+        self._pending.put(('review', (record, review_text)))
+
+    def save_device(self, device_id, device):
+        """Queue an insert or update of a registered device"""
+        self._pending.put(('device', (device_id, dict(device))))
+
+    def save_feedback(self, review_id, label, received_at):
+        """Queue a ground-truth label for a stored review, replacing any earlier one"""
+        self._pending.put(('feedback', (review_id, label, received_at)))
+
+    def _write_loop(self):
+        conn = self._connection()
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._pending.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            if any(item is _STOP for item in batch):
+                stopping = True
+            try:
+                self._write_batch(conn, [item for item in batch if item is not _STOP])
+            except Exception as e:
+                logger.error(f"Failed to persist {len(batch)} analytics writes: {e}")
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+
+    def _write_batch(self, conn, batch):
+        reviews = []
+        devices = {}
+        feedback = []
+        for kind, payload in batch:
+            if kind == 'review':
+                record, review_text = payload
+                reviews.append((record['id'], record.get('device_id'), record.get('timestamp'),
+                                record.get('prediction'), json.dumps(record), review_text))
+            elif kind == 'feedback':
+                feedback.append(payload)
+            else:
+                device_id, device = payload
+                devices[device_id] = (device_id, device['created_at'], device['last_seen'], device['total_reviews'])
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO reviews (id, device_id, timestamp, prediction, record, review_text) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                reviews)
+            conn.executemany(
+                'INSERT INTO devices (device_id, created_at, last_seen, total_reviews) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(device_id) DO UPDATE SET last_seen = excluded.last_seen, '
+                'total_reviews = excluded.total_reviews',
+                devices.values())
+            # Replacing moves a relabelled review to the end of the feedback log, so the trainer sees it again
+            conn.executemany('INSERT OR REPLACE INTO feedback (review_id, label, received_at) VALUES (?, ?, ?)',
+                             feedback)
+
+    def flush(self):
+        """Block until every queued write has been committed"""
+        self._pending.join()
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        if self._writer.is_alive():
+            self._pending.put(_STOP)
+            self._writer.join()
+
+    def count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM reviews').fetchone()[0]
+
+    def device_recent(self, device_id, limit=10):
+        """Return a device's most recent reviews, oldest first"""
+        records = [r for r in list(self.recent) if r.get('device_id') == device_id][-limit:]
+        if len(records) < limit:
+            seen = {r['id'] for r in records}
+            rows = self._connection().execute(
+                'SELECT record FROM reviews WHERE device_id = ? ORDER BY rowid DESC LIMIT ?',
+                (device_id, limit + len(seen))).fetchall()
+            older = [json.loads(row[0]) for row in rows]
+            older = [r for r in older if r['id'] not in seen][:limit - len(records)]
+            records = older[::-1] + records
+        return records
+
+    def has_review(self, review_id):
+        if any(r['id'] == review_id for r in list(self.recent)):
+            return True
+        return self._connection().execute('SELECT 1 FROM reviews WHERE id = ?', (review_id,)).fetchone() is not None
+
+    def feedback_count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM feedback').fetchone()[0]
+
+    def feedback_since(self, after=0, limit=1000):
+        """
+        Return up to limit labelled reviews logged after feedback rowid after, oldest first.
+
+        Each row is (rowid, review_id, label, review_text, similarity_score);
+        the text is None for reviews stored without it.
+        """
+        rows = self._connection().execute(
+            'SELECT feedback.rowid, feedback.review_id, feedback.label, reviews.review_text, reviews.record '
+            'FROM feedback JOIN reviews ON reviews.id = feedback.review_id '
+            'WHERE feedback.rowid > ? ORDER BY feedback.rowid LIMIT ?', (after, limit)).fetchall()
+        return [(rowid, review_id, label, review_text, json.loads(record).get('similarity_score', 0.0))
+                for rowid, review_id, label, review_text, record in rows]
+
+    def iter_reviews(self):
+        """Yield (device_id, timestamp, prediction) for every stored review in insertion order"""
+        cursor = self._connection().execute(
+            'SELECT device_id, timestamp, prediction FROM reviews ORDER BY rowid')
+        yield from cursor
+
+    def load_devices(self):
+        """Return every persisted device registration keyed by device id"""
+        rows = self._connection().execute(
+            'SELECT device_id, created_at, last_seen, total_reviews FROM devices').fetchall()
+        return {
+            device_id: {'created_at': created_at, 'last_seen': last_seen, 'total_reviews': total_reviews}
+            for device_id, created_at, last_seen, total_reviews in rows
+        }
@@ -0,0 +1,35 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import DeviceTimeIndex  # noqa: E402
+
+START = datetime(2026, 3, 2, 12)
+
+
+def test_out_of_order_review_within_window_is_counted():
+    index = DeviceTimeIndex(retain_days=3)
+    for days in (0, 2):
+        index.add('device', START + timedelta(days=days))
+    index.add('device', START + timedelta(days=1))
+    assert [index.counts('device', START + timedelta(days=days))[0] for days in range(3)] == [1, 1, 1]
+
+
+def test_backfill_before_retained_window_keeps_newer_buckets():
+    index = DeviceTimeIndex(retain_days=3)
+    for days in range(1, 4):
+        index.add('device', START + timedelta(days=days))
+    index.add('device', START)
+    assert [index.counts('device', START + timedelta(days=days))[0] for days in range(4)] == [0, 1, 1, 1]
+    assert index.stats('device')['total_reviews'] == 4
+    assert index.stats('device')['avg_reviews_per_day'] == 1
+
+
+def test_new_day_evicts_oldest_bucket():
+    index = DeviceTimeIndex(retain_days=3)
+    for days in range(4):
+        index.add('device', START + timedelta(days=days))
+    assert index.counts('device', START)[0] == 0
+    assert index.counts('device', START + timedelta(days=3))[0] == 1
@@ -34,6 +34,8 @@ import pandas as pd
 import altair as alt
 import re
 import string
+import tempfile
+from scipy import sparse
 import matplotlib.pyplot as plt
 from textblob import TextBlob
 from wordcloud import WordCloud
@@ -57,6 +59,17 @@ model, vectorizer = load_model_vectorizer()
 if model is None or vectorizer is None:
     st.stop()
 
+# The model was trained on the TF-IDF features followed by 11 engineered
+# features that are not available at prediction time and are left as zeros
+N_EXTRA_FEATURES = 11
+LABELS = ["Computer generated", "Original"]
+
+def build_features(texts):
+    """Sparse model input: TF-IDF columns plus an all-zero block for the extra features"""
+    x_text = vectorizer.transform(texts)
+    extra = sparse.csr_matrix((x_text.shape[0], N_EXTRA_FEATURES), dtype=x_text.dtype)
+    return sparse.hstack((x_text, extra), format="csr")
+
 # -------------------------------
 # Single Prediction Section
 # -------------------------------
@@ -70,9 +83,7 @@ if st.button("Predict"):
         st.error("Please enter some text.")
     else:
         with st.spinner("Analyzing..."):
-            x_text = vectorizer.transform([review_text])
-            dummy = np.zeros((1, 11))
-            feats = np.hstack((x_text.toarray(), dummy))
+            feats = build_features([review_text])
             try:
                 probabilities = model.predict_proba(feats)[0]
             except Exception:
@@ -94,3 +105,57 @@ if st.button("Predict"):
                     y="Probability"
                 ).properties(title="Prediction Probability Distribution", width=300, height=400)
                 st.altair_chart(bar_chart, use_container_width=True)
+
+# -------------------------------
+# Bulk Prediction Section
+# -------------------------------
+st.title("Fake Review Detection - Bulk Prediction")
+
+def score_csv(uploaded, text_column, chunk_size, threshold, progress):
+    """
+    Score an uploaded CSV chunk by chunk, appending results to a gzipped temp file.
+
+    Only one chunk and its sparse features are held in memory at a time;
+    each chunk is scored with a single predict_proba call.
+    """
+    uploaded.seek(0)
+    out = tempfile.NamedTemporaryFile(prefix="predictions_", suffix=".csv.gz", delete=False)
+    out.close()
+    counts = {label: 0 for label in LABELS}
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(uploaded, chunksize=chunk_size)):
+        texts = chunk[text_column].fillna("").astype(str)
+        probabilities = model.predict_proba(build_features(texts))
+        original = probabilities[:, 1] >= threshold
+        chunk["prediction"] = np.where(original, LABELS[1], LABELS[0])
+        chunk["probability_original"] = probabilities[:, 1]
+        chunk.to_csv(out.name, mode="a", header=(i == 0), index=False, compression="gzip")
+        counts[LABELS[1]] += int(original.sum())
+        counts[LABELS[0]] += int(len(chunk) - original.sum())
+        rows += len(chunk)
+        # The reader has consumed the upload at least up to this chunk
+        progress.progress(min(uploaded.tell() / max(uploaded.size, 1), 1.0), text=f"Scored {rows:,} reviews")
+    progress.progress(1.0, text=f"Scored {rows:,} reviews")
+    return out.name, counts
+
+uploaded = st.file_uploader("Upload a CSV of reviews:", type="csv")
+if uploaded is not None:
+    columns = list(pd.read_csv(uploaded, nrows=0).columns)
+    default_column = columns.index("text") if "text" in columns else 0
+    text_column = st.selectbox("Review text column", columns, index=default_column)
+    chunk_size = st.number_input("Rows per chunk", min_value=1000, max_value=200000, value=50000, step=1000)
+
+    if st.button("Predict all"):
+        with st.spinner("Scoring..."):
+            result_path, counts = score_csv(uploaded, text_column, int(chunk_size), threshold, st.progress(0.0))
+        previous = st.session_state.get("bulk_result")
+        if previous and os.path.exists(previous["path"]):
+            os.remove(previous["path"])
+        st.session_state["bulk_result"] = {"path": result_path, "name": uploaded.name, "counts": counts}
+
+    result = st.session_state.get("bulk_result")
+    if result and result["name"] == uploaded.name and os.path.exists(result["path"]):
+        st.success(", ".join(f"{label}: {count:,}" for label, count in result["counts"].items()))
+        with open(result["path"], "rb") as f:
+            st.download_button("Download predictions", f, file_name=f"{os.path.splitext(result['name'])[0]}_predictions.csv.gz",
+                               mime="application/gzip")
@@ -0,0 +1,206 @@
+"""
+Linguistic features from Notebooks/N2_Feature_engineering.ipynb in a single pass.
+
+Each review is tokenized, tagged and entity-recognized once by spaCy, and
+every feature (lexical diversity, average word length, sentiment polarity,
+subjectivity, Flesch reading ease, sentence length, named entity count,
+punctuation count and noun/verb/adjective/adverb counts) is computed from
+that one Doc inside the spaCy pipeline, so nlp.pipe(n_process=...) spreads
+all of the work across processes.
+
+The same LinguisticFeatureExtractor is used for offline feature files and,
+via backend/app.py, at serving time.
+
+Usage (from the src folder):
+    python feature_engineering.py --datasets preprocessed_lemmatization --n-process 4
+"""
+import argparse
+import os
+import string
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import spacy
+import textstat
+from sklearn.base import BaseEstimator, TransformerMixin
+from spacy.language import Language
+from spacy.tokens import Doc
+from textblob import TextBlob
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+FEATURE_NAMES = [
+    "lexical_diversity",
+    "avg_word_length",
+    "sentiment_polarity",
+    "subjectivity",
+    "flesch_reading_ease",
+    "sentence_length",
+    "named_entity_count",
+    "punctuation_count",
+    "noun_count",
+    "verb_count",
+    "adj_count",
+    "adv_count"
+]
+
+# Penn Treebank tag prefixes counted for noun_count, verb_count, adj_count and adv_count
+POS_PREFIXES = ("NN", "VB", "JJ", "RB")
+
+DATASETS = [
+    "preprocessed_lemmatization",
+    "preprocessed_no_stopwords",
+    "preprocessed_stemming",
+    "preprocessed_stemming_no_stopwords",
+    "preprocessed_no_stopwords_no_lemmatization",
+]
+
+_PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+if not Doc.has_extension("review_features"):
+    Doc.set_extension("review_features", default=None)
+
+
+@lru_cache(maxsize=100_000)
+def syllable_count(word: str) -> int:
+    """Syllables in a word, as counted by textstat."""
+    return textstat.syllable_count(word)
+
+
+def document_features(doc) -> list:
+    """Compute every feature in FEATURE_NAMES from one processed Doc."""
+    text = doc.text
+    tokens = [token for token in doc if not token.is_space]
+    n_tokens = len(tokens)
+    words = [token.text for token in tokens if not token.is_punct]
+
+    lexical_diversity = len({token.text for token in tokens}) / n_tokens if n_tokens else 0
+    avg_word_length = sum(len(token.text) for token in tokens) / n_tokens if n_tokens else 0
+    sentiment = TextBlob(text).sentiment
+
+    # Flesch reading ease from the same tokens: 206.835 - 1.015 * words/sentences - 84.6 * syllables/words
+    if words:
+        n_sentences = sum(1 for _ in doc.sents) if doc.has_annotation("SENT_START") else 1
+        syllables = sum(syllable_count(word) for word in words)
+        flesch = 206.835 - 1.015 * len(words) / max(n_sentences, 1) - 84.6 * syllables / len(words)
+    else:
+        flesch = 0
+
+    pos_counts = [0] * len(POS_PREFIXES)
+    for token in tokens:
+        for i, prefix in enumerate(POS_PREFIXES):
+            if token.tag_.startswith(prefix):
+                pos_counts[i] += 1
+
+    return [
+        lexical_diversity,
+        avg_word_length,
+        sentiment.polarity,
+        sentiment.subjectivity,
+        flesch,
+        n_tokens,
+        len(doc.ents),
+        len(text) - len(text.translate(_PUNCTUATION_TABLE)),
+        *pos_counts
+    ]
+
+
+@Language.component("review_features")
+def review_features_component(doc):
+    doc._.review_features = document_features(doc)
+    return doc
+
+
+def load_nlp(spacy_model: str = "en_core_web_sm"):
+    """Load spaCy with only the components the features need, plus the feature component."""
+    nlp = spacy.load(spacy_model, exclude=["lemmatizer"])
+    if "parser" in nlp.pipe_names:
+        # The dependency parse is only needed for sentence boundaries, which
+        # the much cheaper senter component provides
+        nlp.disable_pipe("parser")
+        if "senter" in nlp.disabled:
+            nlp.enable_pipe("senter")
+    nlp.add_pipe("review_features", last=True)
+    return nlp
+
+
+class LinguisticFeatureExtractor(BaseEstimator, TransformerMixin):
+    """
+    Single-pass linguistic features for review text.
+
+    transform() runs the texts through nlp.pipe once and returns a
+    column-major float32 matrix with one column per name in FEATURE_NAMES.
+    The spaCy pipeline is loaded on first use and not pickled.
+    """
+
+    def __init__(self, spacy_model="en_core_web_sm", n_process=1, batch_size=256):
+        self.spacy_model = spacy_model
+        self.n_process = n_process
+        self.batch_size = batch_size
+
+    @property
+    def nlp(self):
+        if getattr(self, "_nlp", None) is None:
+            self._nlp = load_nlp(self.spacy_model)
+        return self._nlp
+
+    def fit(self, texts=None, y=None):
+        return self
+
+    def transform(self, texts):
+        """Return an (n_texts, len(FEATURE_NAMES)) float32 matrix"""
+        texts = ["" if pd.isna(text) else str(text) for text in texts]
+        feats = np.empty((len(texts), len(FEATURE_NAMES)), dtype=np.float32, order="F")
+        # Small requests are not worth starting worker processes for
+        n_process = self.n_process if len(texts) >= 4 * self.batch_size else 1
+        for i, doc in enumerate(self.nlp.pipe(texts, n_process=n_process, batch_size=self.batch_size)):
+            feats[i] = doc._.review_features
+        return feats
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(FEATURE_NAMES, dtype=object)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_nlp", None)
+        return state
+
+
+def feature_engineering(input_path: str, output_path: str, extractor: LinguisticFeatureExtractor,
+                        text_column: str = "processed_text", chunk_size: int = 20000):
+    """Append the feature columns to a preprocessed CSV, chunk by chunk."""
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_size)):
+        chunk[text_column] = chunk[text_column].fillna("").astype(str)
+        feats = extractor.transform(chunk[text_column])
+        chunk = pd.concat([chunk, pd.DataFrame(feats, columns=FEATURE_NAMES, index=chunk.index)], axis=1)
+        chunk.to_csv(output_path, mode="a", header=(i == 0), index=False)
+        rows += len(chunk)
+        print(f"{os.path.basename(input_path)}: {rows} rows")
+    print(f"Features extracted & saved: {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", nargs="+", default=DATASETS)
+    parser.add_argument("--input-dir", default=os.path.join(base_dir, "..", "Data", "Pre-processed"))
+    parser.add_argument("--output-dir", default=os.path.join(base_dir, "..", "Data", "Feature-Engineered"))
+    parser.add_argument("--spacy-model", default="en_core_web_sm")
+    parser.add_argument("--n-process", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--chunk-size", type=int, default=20000)
+    args = parser.parse_args()
+
+    extractor = LinguisticFeatureExtractor(args.spacy_model, args.n_process, args.batch_size)
+    os.makedirs(args.output_dir, exist_ok=True)
+    for dataset in args.datasets:
+        feature_engineering(os.path.join(args.input_dir, f"{dataset}.csv"),
+                            os.path.join(args.output_dir, f"{dataset}_features.csv"),
+                            extractor, chunk_size=args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+On-disk store of the N4 text representations (TF-IDF, sentence embeddings, GloVe).
+
+Each dataset gets a directory holding a manifest.json and one file per
+feature: sparse TF-IDF matrices as .npz, dense embeddings as .npy files that
+are written batch by batch through a memory map and read back with
+mmap_mode='r', so slicing rows does not copy or parse anything. Rows are
+keyed by a hash of their text; a rerun only encodes rows whose text is new
+or changed and copies the rest from the previous version. Each dense
+feature records the identity of its encoder (model name or GloVe file
+digest, plus dimension); when that changes, every row is encoded again.
+
+Files are versioned by the row hashes and encoder identities, and the
+manifest is replaced last, so an interrupted update leaves the previous
+version readable.
+
+Usage (from the src folder):
+    python feature_store.py --features tfidf bert --dtype float16
+"""
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STORE_DIR = os.path.join(base_dir, "..", "Data", "Feature-Store")
+DEFAULT_INPUT_DIR = os.path.join(base_dir, "..", "Data", "Pre-processed")
+
+DATASETS = [
+    "preprocessed_lemmatization",
+    "preprocessed_no_stopwords",
+    "preprocessed_stemming",
+    "preprocessed_stemming_no_stopwords",
+    "preprocessed_no_stopwords_no_lemmatization",
+]
+
+MANIFEST_NAME = "manifest.json"
+
+
+def text_hashes(texts) -> np.ndarray:
+    """64-bit BLAKE2b hash of each text, used to match rows across versions"""
+    return np.fromiter((int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+                        for text in texts), dtype=np.uint64, count=len(texts))
+
+
+def file_digest(path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    """Read and incrementally update the stored features of one dataset."""
+
+    def __init__(self, path):
+        self.path = path
+        manifest_path = os.path.join(path, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"version": None, "rows": 0, "hashes": None, "labels": None, "features": {}}
+
+    @property
+    def rows(self) -> int:
+        return self.manifest["rows"]
+
+    def feature_names(self) -> list:
+        return list(self.manifest["features"])
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def hashes(self) -> np.ndarray:
+        if not self.manifest["hashes"]:
+            return np.zeros(0, dtype=np.uint64)
+        return np.load(self._file(self.manifest["hashes"]), mmap_mode="r")
+
+    def labels(self):
+        """Row labels, or None if the store was built without them"""
+        if not self.manifest["labels"]:
+            return None
+        return np.load(self._file(self.manifest["labels"]), mmap_mode="r")
+
+    def dense(self, name) -> np.ndarray:
+        """Memory-mapped (rows, dim) embedding matrix; slicing it reads only the rows used"""
+        entry = self.manifest["features"][name]
+        if entry["kind"] != "dense":
+            raise ValueError(f"Feature {name} is {entry['kind']}, not dense")
+        return np.load(self._file(entry["file"]), mmap_mode="r")
+
+    def sparse(self, name) -> sparse.csr_matrix:
+        """(rows, vocabulary) CSR matrix"""
+        entry = self.manifest["features"][name]
+        if entry["kind"] != "sparse":
+            raise ValueError(f"Feature {name} is {entry['kind']}, not sparse")
+        return sparse.load_npz(self._file(entry["file"])).tocsr()
+
+    def vectorizer(self, name):
+        """The fitted vectorizer a sparse feature was built with"""
+        return joblib.load(self._file(self.manifest["features"][name]["vectorizer"]))
+
+    def load(self, name):
+        """A feature matrix by name, dense or sparse"""
+        return self.dense(name) if self.manifest["features"][name]["kind"] == "dense" else self.sparse(name)
+
+    def update(self, texts, labels=None, dense=None, sparse_features=None, refit=False, batch_size=1024):
+        """
+        Bring the store in line with texts, re-encoding only new or changed rows.
+
+        dense maps a feature name to (encoder, dtype, encoder_id), where
+        encoder turns a list of texts into a (n, dim) array and encoder_id
+        identifies its output; rows are only reused from a version encoded
+        with the same encoder_id. sparse_features maps a name to a
+        factory returning an unfitted vectorizer; the vectorizer is fitted on
+        the first build (or with refit=True) and reused afterwards so
+        existing rows stay valid. Features not listed are kept only if the
+        rows did not change.
+        """
+        texts = ["" if pd.isna(text) else str(text) for text in texts]
+        hashes = text_hashes(texts)
+        rows_version = hashlib.blake2b(hashes.tobytes(), digest_size=6).hexdigest()
+        # Manifests written before encoder ids were recorded versioned by the rows alone
+        unchanged = rows_version == self.manifest.get("rows_version", self.manifest["version"])
+        encoder_ids = {name: encoder_id for name, (_, _, encoder_id) in (dense or {}).items()}
+        if unchanged:
+            for name, entry in self.manifest["features"].items():
+                if entry["kind"] == "dense":
+                    encoder_ids.setdefault(name, entry.get("encoder"))
+        version = hashlib.blake2b(hashes.tobytes() + json.dumps(encoder_ids, sort_keys=True).encode("utf-8"),
+                                  digest_size=6).hexdigest()
+
+        previous = self.hashes()
+        previous_rows = {int(h): i for i, h in enumerate(previous)}
+        # Row of the previous version holding the same text, or -1 to encode
+        source = np.fromiter((previous_rows.get(int(h), -1) for h in hashes), dtype=np.int64, count=len(hashes))
+        print(f"{self.path}: {int((source < 0).sum())} of {len(texts)} rows to encode")
+
+        os.makedirs(self.path, exist_ok=True)
+        features = {}
+        for name, (encoder, dtype, encoder_id) in (dense or {}).items():
+            entry = self.manifest["features"].get(name)
+            if (unchanged and entry and entry["kind"] == "dense" and entry["dtype"] == np.dtype(dtype).name
+                    and entry.get("encoder") == encoder_id):
+                features[name] = entry
+            else:
+                features[name] = self._update_dense(name, version, texts, source, encoder, dtype, encoder_id,
+                                                    batch_size)
+        for name, factory in (sparse_features or {}).items():
+            entry = self.manifest["features"].get(name)
+            if unchanged and entry and entry["kind"] == "sparse" and not refit:
+                features[name] = entry
+            else:
+                features[name] = self._update_sparse(name, version, texts, source, factory, refit)
+        if unchanged:
+            for name, entry in self.manifest["features"].items():
+                features.setdefault(name, entry)
+
+        hashes_file = f"hashes.{rows_version}.npy"
+        if not unchanged:
+            self._save_array(hashes_file, hashes)
+        labels_file = self.manifest["labels"] if unchanged else None
+        if labels is not None:
+            labels_file = f"labels.{version}.npy"
+            labels = np.asarray(labels)
+            # String labels come out of pandas as objects, which np.load cannot memory-map
+            self._save_array(labels_file, labels.astype(str) if labels.dtype == object else labels)
+
+        manifest = {"version": version, "rows_version": rows_version, "rows": len(texts), "hashes": hashes_file, "labels": labels_file,
+                    "features": features, "updated_at": datetime.now().isoformat()}
+        tmp_path = self._file(MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self._file(MANIFEST_NAME))
+        self.manifest = manifest
+        self._remove_unreferenced()
+        return self
+
+    def _save_array(self, file_name, array):
+        # Write beside and rename, so readers mapping the old file are unaffected
+        tmp_path = self._file(file_name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, self._file(file_name))
+
+    def _update_dense(self, name, version, texts, source, encoder, dtype, encoder_id, batch_size):
+        entry = self.manifest["features"].get(name)
+        if entry and entry["kind"] == "dense" and entry.get("encoder") == encoder_id:
+            old = self.dense(name)
+        else:
+            old = None
+            if entry:
+                print(f"{name}: encoder changed from {entry.get('encoder')} to {encoder_id}, encoding every row")
+        missing = np.flatnonzero(source < 0) if old is not None else np.arange(len(texts))
+        reused = np.flatnonzero(source >= 0) if old is not None else np.zeros(0, dtype=np.int64)
+
+        file_name = f"{name}.{version}.npy"
+        tmp_path = self._file(file_name + ".tmp")
+        out = None
+        if old is not None:
+            out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(len(texts), old.shape[1]))
+            for start in range(0, len(reused), batch_size):
+                rows = reused[start:start + batch_size]
+                out[rows] = old[source[rows]]
+        for start in range(0, len(missing), batch_size):
+            rows = missing[start:start + batch_size]
+            encoded = np.asarray(encoder([texts[i] for i in rows]))
+            if out is None:
+                out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(len(texts), encoded.shape[1]))
+            out[rows] = encoded
+        print(f"{name}: encoded {len(missing)} rows, copied {len(reused)}")
+        if out is None:
+            out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(0, 0))
+        dim = out.shape[1]
+        out.flush()
+        del out
+        os.replace(tmp_path, self._file(file_name))
+        return {"kind": "dense", "file": file_name, "dtype": np.dtype(dtype).name, "dim": dim, "encoder": encoder_id}
+
+    def _update_sparse(self, name, version, texts, source, factory, refit):
+        entry = self.manifest["features"].get(name)
+        if entry is None or entry["kind"] != "sparse" or refit:
+            vectorizer = factory()
+            matrix = vectorizer.fit_transform(texts).tocsr()
+            vectorizer_file = f"{name}.vectorizer.{version}.pkl"
+            joblib.dump(vectorizer, self._file(vectorizer_file))
+        else:
+            vectorizer_file = entry["vectorizer"]
+            vectorizer = joblib.load(self._file(vectorizer_file))
+            old = self.sparse(name)
+            reused = np.flatnonzero(source >= 0)
+            missing = np.flatnonzero(source < 0)
+            stacked = sparse.vstack([old[source[reused]], vectorizer.transform([texts[i] for i in missing])]).tocsr()
+            # stacked holds reused rows then new rows; put them back in input order
+            order = np.empty(len(texts), dtype=np.int64)
+            order[np.concatenate([reused, missing])] = np.arange(len(texts))
+            matrix = stacked[order]
+
+        file_name = f"{name}.{version}.npz"
+        sparse.save_npz(self._file(file_name), matrix)
+        return {"kind": "sparse", "file": file_name, "vectorizer": vectorizer_file, "dim": matrix.shape[1]}
+
+    def _remove_unreferenced(self):
+        referenced = {MANIFEST_NAME, self.manifest["hashes"], self.manifest["labels"]}
+        for entry in self.manifest["features"].values():
+            referenced.update({entry["file"], entry.get("vectorizer")})
+        for file_name in os.listdir(self.path):
+            if file_name not in referenced and file_name.endswith((".npy", ".npz", ".pkl", ".tmp")):
+                os.remove(self._file(file_name))
+
+
+def tfidf_vectorizer():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(max_features=5000)
+
+
+def sentence_transformer_encoder(model_name="all-MiniLM-L6-v2", batch_size=256):
+    """(encoder, encoder_id) for FeatureStore.update using a SentenceTransformer model"""
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    encoder_id = f"sentence-transformers:{model_name}:{model.get_sentence_embedding_dimension()}"
+    return lambda texts: model.encode(texts, batch_size=batch_size, show_progress_bar=False), encoder_id
+
+
+def glove_encoder(glove_file_path, embedding_dim=100):
+    """(encoder, encoder_id) averaging GloVe vectors over each text's tokens, as in N4"""
+    from nltk.tokenize import word_tokenize
+    embeddings_index = {}
+    with open(glove_file_path, encoding="utf8") as f:
+        for line in f:
+            values = line.split()
+            embeddings_index[values[0]] = np.asarray(values[1:], dtype="float32")
+
+    def encode(texts):
+        out = np.zeros((len(texts), embedding_dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            vectors = [embeddings_index[word] for word in word_tokenize(text.lower()) if word in embeddings_index]
+            if vectors:
+                out[i] = np.mean(vectors, axis=0)
+        return out
+    return encode, f"glove:{file_digest(glove_file_path)}:{embedding_dim}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", nargs="+", default=DATASETS)
+    parser.add_argument("--input-dir", default=DEFAULT_INPUT_DIR)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--features", nargs="+", choices=["tfidf", "bert", "glove"], default=["tfidf", "bert"])
+    parser.add_argument("--dtype", choices=["float16", "float32"], default="float16",
+                        help="Storage dtype of dense embeddings")
+    parser.add_argument("--bert-model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--glove", default=os.path.join(base_dir, "..", "..", "glove_data", "glove.6B.100d.txt"))
+    parser.add_argument("--text-column", default="processed_text")
+    parser.add_argument("--label-column", default="label")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--refit", action="store_true", help="Refit TF-IDF and recompute every row")
+    args = parser.parse_args()
+
+    dense = {}
+    if "bert" in args.features:
+        encoder, encoder_id = sentence_transformer_encoder(args.bert_model)
+        dense["bert"] = (encoder, args.dtype, encoder_id)
+    if "glove" in args.features:
+        encoder, encoder_id = glove_encoder(args.glove)
+        dense["glove"] = (encoder, args.dtype, encoder_id)
+    sparse_features = {"tfidf": tfidf_vectorizer} if "tfidf" in args.features else {}
+
+    for dataset in args.datasets:
+        df = pd.read_csv(os.path.join(args.input_dir, f"{dataset}.csv"))
+        labels = df[args.label_column].to_numpy() if args.label_column in df else None
+        store = FeatureStore(os.path.join(args.store, dataset))
+        store.update(df[args.text_column].tolist(), labels, dense, sparse_features, args.refit, args.batch_size)
+        print(f"{dataset}: {store.rows} rows, features {', '.join(store.feature_names())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Text normalization for the N1 preprocessing variants.
+
+Same steps as Notebooks/N1_Pre_processing.ipynb (emoji removal, contraction
+expansion, number-to-words, punctuation stripping, tokenization, optional
+SymSpell correction, stopword removal, lemmatization or stemming), but each
+review is tokenized once and the tokens are reused for every variant.
+Per-token spelling corrections, lemmas and stems are memoized in bounded
+LRU caches, and the input is processed in chunks across a process pool.
+
+Usage (from the src folder):
+    python preprocessing.py --input ../Data/Pre-processed/encoded_dataset.csv
+
+Each variant is written to <output-dir>/<filename>.csv with the input
+columns plus processed_text. Progress is checkpointed after every chunk; an
+interrupted run resumes from the last completed chunk unless --restart is given.
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import re
+import string
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import contractions
+import inflect
+import nltk
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.corpus.reader.wordnet import ADJ, ADV, NOUN, VERB
+from nltk.stem import SnowballStemmer, WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DICTIONARY_PATH = os.path.join(base_dir, "..", "Assets", "frequency_dictionary_en_82_765.txt")
+DEFAULT_INPUT_PATH = os.path.join(base_dir, "..", "Data", "Pre-processed", "encoded_dataset.csv")
+DEFAULT_OUTPUT_DIR = os.path.join(base_dir, "..", "Data", "Pre-processed")
+CHECKPOINT_NAME = ".preprocessing_checkpoint.json"
+
+# Review vocabulary is heavily repetitive; this bounds each per-token cache
+TOKEN_CACHE_SIZE = 200_000
+
+# (resource, package) for the tokenizer, POS tagger, stopwords and lemmatizer;
+# NLTK 3.9+ loads punkt_tab and averaged_perceptron_tagger_eng instead of the originals
+NLTK_RESOURCES = [
+    ("tokenizers/punkt", "punkt"),
+    ("tokenizers/punkt_tab", "punkt_tab"),
+    ("taggers/averaged_perceptron_tagger", "averaged_perceptron_tagger"),
+    ("taggers/averaged_perceptron_tagger_eng", "averaged_perceptron_tagger_eng"),
+    ("corpora/stopwords", "stopwords"),
+    ("corpora/wordnet", "wordnet"),
+]
+
+CONFIGURATIONS = [
+    {
+        "remove_stopwords": False,
+        "use_stemming": False,
+        "use_lemmatization": True,
+        "use_spell_correction": False,
+        "expand_contractions_flag": True,
+        "filename": "preprocessed_lemmatization"
+    },
+    {
+        "remove_stopwords": True,
+        "use_stemming": False,
+        "use_lemmatization": False,
+        "use_spell_correction": False,
+        "expand_contractions_flag": True,
+        "filename": "preprocessed_no_stopwords_no_lemmatization"
+    },
+    {
+        "remove_stopwords": True,
+        "use_stemming": False,
+        "use_lemmatization": True,
+        "use_spell_correction": False,
+        "expand_contractions_flag": True,
+        "filename": "preprocessed_no_stopwords"
+    },
+    {
+        "remove_stopwords": True,
+        "use_stemming": True,
+        "use_lemmatization": False,
+        "use_spell_correction": False,
+        "expand_contractions_flag": True,
+        "filename": "preprocessed_stemming_no_stopwords"
+    },
+    {
+        "remove_stopwords": False,
+        "use_stemming": True,
+        "use_lemmatization": False,
+        "use_spell_correction": False,
+        "expand_contractions_flag": True,
+        "filename": "preprocessed_stemming"
+    }
+]
+
+_EMOJI_PATTERN = re.compile(r'[^\x00-\x7F]+')
+_HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+_NUMBER_PATTERN = re.compile(r'\b\d+\b')
+_PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+_POS_TO_WORDNET = {"J": ADJ, "N": NOUN, "V": VERB, "R": ADV}
+
+_lemmatizer = WordNetLemmatizer()
+_stemmer = SnowballStemmer("english")
+_inflect_engine = inflect.engine()
+_stop_words = None
+_sym_spell = None
+
+
+def ensure_nltk_data():
+    """Download the NLTK resources used here when they are missing, as N1 does"""
+    for resource, package in NLTK_RESOURCES:
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            nltk.download(package, quiet=True)
+
+
+def load_symspell(dictionary_path: str = DEFAULT_DICTIONARY_PATH):
+    """Load the SymSpell dictionary once per process; forked workers share the parent's copy."""
+    global _sym_spell
+    if _sym_spell is None:
+        from symspellpy import SymSpell
+        sym_spell = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
+        if not sym_spell.load_dictionary(dictionary_path, term_index=0, count_index=1):
+            raise FileNotFoundError(f"SymSpell dictionary file not found at {dictionary_path}")
+        _sym_spell = sym_spell
+    return _sym_spell
+
+
+def _stopword_set() -> set:
+    global _stop_words
+    if _stop_words is None:
+        _stop_words = set(stopwords.words("english"))
+    return _stop_words
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def number_to_words(number: str) -> str:
+    """Word representation of a digit string (e.g., '4' -> 'four')."""
+    return _inflect_engine.number_to_words(number)
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def correct_spelling(word: str) -> str:
+    """Correct spelling using SymSpell, returning the closest suggestion if available."""
+    from symspellpy import Verbosity
+    suggestions = _sym_spell.lookup(word, Verbosity.CLOSEST, max_edit_distance=2)
+    return suggestions[0].term if suggestions else word
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def lemmatize_word(word: str) -> str:
+    """WordNet lemma of a word, using its (context-free) NLTK POS tag."""
+    tag = nltk.pos_tag([word])[0][1][0].upper()
+    return _lemmatizer.lemmatize(word, _POS_TO_WORDNET.get(tag, NOUN))
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def stem_word(word: str) -> str:
+    """Snowball stem of a word."""
+    return _stemmer.stem(word)
+
+
+def tokenize(text, expand_contractions_flag: bool = True) -> list:
+    """Clean a review and split it into tokens; shared by every variant."""
+    if pd.isna(text) or not isinstance(text, str):
+        return []
+    text = _EMOJI_PATTERN.sub('', text)
+    if expand_contractions_flag:
+        text = contractions.fix(text)
+    text = _HTML_TAG_PATTERN.sub('', text)
+    text = text.lower()
+    text = _NUMBER_PATTERN.sub(lambda x: number_to_words(x.group()), text)
+    return word_tokenize(text.translate(_PUNCTUATION_TABLE))
+
+
+def normalize_tokens(
+    tokens: list,
+    remove_stopwords: bool = False,
+    use_stemming: bool = False,
+    use_lemmatization: bool = True,
+    use_spell_correction: bool = False,
+    **_
+) -> str:
+    """Apply one variant's token-level steps and join the result."""
+    words = tokens
+    if use_spell_correction:
+        words = [correct_spelling(word) for word in words]
+    if remove_stopwords:
+        stop_words = _stopword_set()
+        words = [word for word in words if word not in stop_words]
+    if use_stemming:
+        words = [stem_word(word) for word in words]
+    elif use_lemmatization:
+        words = [lemmatize_word(word) for word in words]
+    return " ".join(words)
+
+
+def preprocess_text(text, **config) -> str:
+    """Preprocess a single review with one configuration."""
+    return normalize_tokens(tokenize(text, config.get("expand_contractions_flag", True)), **config)
+
+
+def preprocess_variants(texts, configurations=CONFIGURATIONS) -> dict:
+    """Preprocess texts for every configuration, tokenizing each text once; returns {filename: [str]}."""
+    texts = list(texts)
+    tokens_by_flag = {}
+    outputs = {}
+    for config in configurations:
+        flag = config.get("expand_contractions_flag", True)
+        if flag not in tokens_by_flag:
+            tokens_by_flag[flag] = [tokenize(text, flag) for text in texts]
+        outputs[config["filename"]] = [normalize_tokens(tokens, **config) for tokens in tokens_by_flag[flag]]
+    return outputs
+
+
+def _init_worker(dictionary_path):
+    # A no-op under fork, which inherits the parent's dictionary; spawned
+    # workers (macOS/Windows) load their own copy
+    if dictionary_path:
+        load_symspell(dictionary_path)
+
+
+def _process_chunk(texts, configurations):
+    return preprocess_variants(texts, configurations)
+
+
+def _read_checkpoint(path, run_key):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    return checkpoint if checkpoint.get("run") == run_key else None
+
+
+def _write_checkpoint(path, checkpoint):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def preprocess_file(
+    input_path: str,
+    output_dir: str,
+    text_column: str = "deep_translated_text",
+    configurations: list = CONFIGURATIONS,
+    chunk_size: int = 5000,
+    workers: int = None,
+    dictionary_path: str = DEFAULT_DICTIONARY_PATH,
+    restart: bool = False
+) -> dict:
+    """Preprocess a CSV into one output CSV per configuration, resuming from a checkpoint if present."""
+    os.makedirs(output_dir, exist_ok=True)
+    output_paths = {config["filename"]: os.path.join(output_dir, f"{config['filename']}.csv")
+                    for config in configurations}
+    checkpoint_path = os.path.join(output_dir, CHECKPOINT_NAME)
+    run_key = {"input": os.path.abspath(input_path), "text_column": text_column, "chunk_size": chunk_size,
+               "configurations": configurations}
+
+    checkpoint = None if restart else _read_checkpoint(checkpoint_path, run_key)
+    if checkpoint:
+        # Drop anything written after the last completed chunk
+        for name, path in output_paths.items():
+            with open(path, "r+b") as f:
+                f.truncate(checkpoint["offsets"][name])
+        print(f"Resuming after {checkpoint['rows']} rows")
+    else:
+        for path in output_paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+        checkpoint = {"run": run_key, "chunks": 0, "rows": 0, "offsets": {name: 0 for name in output_paths}}
+
+    needs_spelling = any(config.get("use_spell_correction") for config in configurations)
+    if needs_spelling:
+        load_symspell(dictionary_path)
+        # Forked workers share the loaded dictionary copy-on-write; freeze it
+        # so their GC passes do not touch (and copy) its pages
+        gc.freeze()
+    start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+
+    reader = pd.read_csv(input_path, chunksize=chunk_size,
+                         skiprows=range(1, checkpoint["rows"] + 1) if checkpoint["rows"] else None)
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method),
+                             initializer=_init_worker,
+                             initargs=(dictionary_path if needs_spelling else None,)) as executor:
+        pending = deque()
+        chunks = iter(reader)
+        while True:
+            # Keep a bounded number of chunks in flight and write them back in order
+            while len(pending) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending.append((chunk, executor.submit(_process_chunk, chunk[text_column].tolist(), configurations)))
+            if not pending:
+                break
+
+            chunk, future = pending.popleft()
+            outputs = future.result()
+            header = checkpoint["rows"] == 0
+            for name, path in output_paths.items():
+                chunk.assign(processed_text=outputs[name]).to_csv(path, mode="a", header=header, index=False)
+                checkpoint["offsets"][name] = os.path.getsize(path)
+            checkpoint["chunks"] += 1
+            checkpoint["rows"] += len(chunk)
+            _write_checkpoint(checkpoint_path, checkpoint)
+            print(f"Processed {checkpoint['rows']} rows")
+
+    os.remove(checkpoint_path)
+    for path in output_paths.values():
+        print(f"Processed file saved: {path}")
+    return output_paths
+
+
+def check_parity(input_path: str, output_paths: dict, text_column: str, configurations: list,
+                 sample_size: int = 200):
+    """Confirm the written variants match preprocess_text on the first rows of the input."""
+    texts = pd.read_csv(input_path, nrows=sample_size)[text_column]
+    for config in configurations:
+        written = pd.read_csv(output_paths[config["filename"]], nrows=sample_size,
+                              keep_default_na=False)["processed_text"]
+        expected = [preprocess_text(text, **config) for text in texts]
+        if list(written) != expected:
+            raise AssertionError(f"Variant {config['filename']} does not match preprocess_text")
+    print(f"Parity check passed on {len(texts)} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=DEFAULT_INPUT_PATH)
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--text-column", default="deep_translated_text")
+    parser.add_argument("--variants", nargs="+", choices=[config["filename"] for config in CONFIGURATIONS],
+                        help="Subset of variants to produce (default: all)")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dictionary", default=DEFAULT_DICTIONARY_PATH, help="SymSpell frequency dictionary")
+    parser.add_argument("--restart", action="store_true", help="Ignore any checkpoint and start over")
+    args = parser.parse_args()
+
+    ensure_nltk_data()
+    configurations = [config for config in CONFIGURATIONS if not args.variants or config["filename"] in args.variants]
+    output_paths = preprocess_file(args.input, args.output_dir, args.text_column, configurations,
+                                   args.chunk_size, args.workers, args.dictionary, args.restart)
+    check_parity(args.input, output_paths, args.text_column, configurations)
+
+
+if __name__ == "__main__":
+    main()
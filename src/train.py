@@ -0,0 +1,524 @@
+"""
+Local model selection across the preprocessing variants (Notebooks/N5_Modal_dev.ipynb).
+
+Features for each (dataset, feature set) are computed once and cached on
+disk with joblib.Memory, keyed by a digest of the dataset file and the
+feature configuration, so reruns and new models skip featurization.
+
+Every (dataset, feature set, model, hyperparameters) configuration is a job
+on a process pool. Workers are forked after the features are loaded and
+share them copy-on-write; --cpus is split into workers of
+--threads-per-job threads each (n_jobs and BLAS threads are capped to match).
+
+Configurations are trained by successive halving: all of them are fitted on
+the first --rungs fraction of the training rows and scored on the held-out
+split, and a configuration is abandoned when its F1 trails the best of its
+feature set by more than --margin, or another configuration is both at
+least as accurate and faster. Survivors move on to the next fraction.
+
+Runs are tracked in --runs-dir: runs.csv has one row per (run, rung) like
+Notebooks/progress_log.csv, and <run_id>/ holds params.json, metrics.json
+and the final model. Recorded rungs are reused on rerun.
+
+The best model per feature set is exported to what the apps load:
+    tfidf   -> src/model.pkl, src/tfidf_vectorizer.pkl (Streamlit app)
+    review  -> backend/TfidfModel1.pickle, backend/feature_pipeline.pickle and
+               their NumPy-only export in backend/engine/ (Flask API)
+The review export is limited to the models engine.py can export; the
+engine is built and checked in backend/engine.new/ before any file the
+API loads is replaced.
+
+Usage (from the src folder):
+    python train.py --datasets preprocessed_lemmatization --models LogisticRegression RandomForest --cpus 4
+"""
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from functools import partial
+from importlib.util import find_spec
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.model_selection import ParameterGrid
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from threadpoolctl import threadpool_limits
+
+from feature_store import DATASETS, DEFAULT_STORE_DIR, FeatureStore, file_digest
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.join(base_dir, "..", "backend")
+# The review feature set pickles backend/features.py objects into the joblib
+# cache and the runs; they can only be unpickled with backend/ importable
+if backend_dir not in sys.path:
+    sys.path.append(backend_dir)
+DEFAULT_INPUT_DIR = os.path.join(base_dir, "..", "Data", "Feature-Engineered")
+DEFAULT_CACHE_DIR = os.path.join(base_dir, "..", "Data", "cache")
+DEFAULT_RUNS_DIR = os.path.join(base_dir, "..", "runs")
+
+# N2 features used alongside TF-IDF by model.pkl and on their own in N5
+LINGUISTIC_COLUMNS = [
+    "lexical_diversity", "avg_word_length", "sentiment_polarity",
+    "subjectivity", "flesch_reading_ease", "sentence_length",
+    "named_entity_count", "noun_count", "verb_count", "adj_count", "adv_count"
+]
+
+FEATURE_SETS = {
+    "tfidf": {"max_features": 5000},
+    "linguistic": {"columns": LINGUISTIC_COLUMNS},
+    "review": {"max_features": 2000, "min_df": 3, "max_df": 0.6, "n_iter": 100, "random_state": 42},
+}
+
+EXPORTS = {
+    "tfidf": {
+        "model": os.path.join(base_dir, "model.pkl"),
+        "transformer": os.path.join(base_dir, "tfidf_vectorizer.pkl"),
+    },
+    "review": {
+        "model": os.path.join(backend_dir, "TfidfModel1.pickle"),
+        "transformer": os.path.join(backend_dir, "feature_pipeline.pickle"),
+        "engine": os.path.join(backend_dir, "engine"),
+    },
+}
+
+# Models engine.py can export; a feature set exported with an engine only considers these
+ENGINE_MODELS = {"LogisticRegression", "RandomForest", "ExtraTrees"}
+
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+
+class KerasDenseClassifier(BaseEstimator, ClassifierMixin):
+    """The N5 dense network (256-128-64 with dropout) behind the scikit-learn interface."""
+
+    def __init__(self, epochs=5, batch_size=256, dropout=0.3):
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.dropout = dropout
+
+    def fit(self, X, y):
+        from tensorflow import keras
+        self.classes_ = np.unique(y)
+        model = keras.Sequential([keras.Input(shape=(X.shape[1],))])
+        for units in (256, 128, 64):
+            model.add(keras.layers.Dense(units, activation="relu"))
+            model.add(keras.layers.Dropout(self.dropout))
+        model.add(keras.layers.Dense(len(self.classes_), activation="softmax"))
+        model.compile(loss="sparse_categorical_crossentropy", optimizer="adam", metrics=["accuracy"])
+        model.fit(np.asarray(X, dtype=np.float32), np.searchsorted(self.classes_, y),
+                  epochs=self.epochs, batch_size=self.batch_size, verbose=0)
+        self.model_ = model
+        return self
+
+    def predict_proba(self, X):
+        return self.model_.predict(np.asarray(X, dtype=np.float32), batch_size=self.batch_size, verbose=0)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def xgboost_classifier(**params):
+    import xgboost
+    return xgboost.XGBClassifier(**params)
+
+
+# name -> (estimator factory, parameter grid, accepts sparse input)
+MODELS = {
+    "LogisticRegression": (
+        LogisticRegression,
+        {"C": [0.1, 1, 10], "max_iter": [500]},
+        True
+    ),
+    "RandomForest": (
+        RandomForestClassifier,
+        {"n_estimators": [50, 100, 200], "max_depth": [None, 10, 20]},
+        True
+    ),
+    "ExtraTrees": (
+        ExtraTreesClassifier,
+        {"n_estimators": [50, 100, 200], "max_depth": [None, 10, 20]},
+        True
+    ),
+}
+if find_spec("xgboost"):
+    MODELS["XGBoost"] = (
+        xgboost_classifier,
+        {"n_estimators": [50, 100, 200], "max_depth": [3, 5, 7], "learning_rate": [0.01, 0.1, 0.2]},
+        True
+    )
+if find_spec("tensorflow"):
+    MODELS["DenseNN"] = (KerasDenseClassifier, {"epochs": [5, 10], "dropout": [0.3]}, False)
+
+
+def compute_features(data_path: str, data_digest: str, feature_set: str, config: dict,
+                     text_column: str = "processed_text", label_column: str = "label"):
+    """
+    Featurize one dataset; cached by joblib.Memory on everything but data_path.
+
+    Returns (X, y, transformer), where transformer is the fitted object the
+    serving app needs to reproduce X from text.
+    """
+    df = pd.read_csv(data_path).dropna(subset=[text_column, label_column])
+    texts = df[text_column].astype(str).tolist()
+    # CG -> 0, OR -> 1, the encoding both apps expect
+    y = LabelEncoder().fit_transform(df[label_column])
+    print(f"Computing {feature_set} features for {os.path.basename(data_path)} ({len(texts)} rows)")
+
+    if feature_set == "tfidf":
+        transformer = TfidfVectorizer(**config)
+        extra = df[LINGUISTIC_COLUMNS].fillna(0).to_numpy(dtype=np.float64)
+        X = sparse.hstack((transformer.fit_transform(texts), sparse.csr_matrix(extra)), format="csr")
+    elif feature_set == "linguistic":
+        transformer = StandardScaler()
+        X = transformer.fit_transform(df[config["columns"]].fillna(0).to_numpy(dtype=np.float64))
+    elif feature_set == "review":
+        from features import ReviewFeatureExtractor
+        transformer = ReviewFeatureExtractor(**config)
+        X = transformer.fit_transform(texts)
+    else:
+        raise ValueError(f"Unknown feature set: {feature_set}")
+    return X, y, transformer
+
+
+def load_store_features(store_dir: str, dataset: str, name: str):
+    """
+    Representations from the N4 feature store; name joins several with "+", e.g. tfidf+bert.
+
+    A single dense feature stays memory-mapped. Blocks are stacked like the
+    tfidf feature set: into one CSR matrix if any of them is sparse.
+    """
+    store = FeatureStore(os.path.join(store_dir, dataset))
+    labels = store.labels()
+    if labels is None:
+        raise ValueError(f"Feature store for {dataset} has no labels")
+    blocks = [store.load(part) for part in name.split("+")]
+    if len(blocks) == 1:
+        X = blocks[0]
+    elif any(sparse.issparse(block) for block in blocks):
+        X = sparse.hstack([sparse.csr_matrix(block) for block in blocks], format="csr")
+    else:
+        X = np.hstack(blocks)
+    return X, LabelEncoder().fit_transform(labels), None
+
+
+def split_rows(n_rows: int):
+    """Fixed shuffled (train, test) row indices; a prefix of train is a random subsample"""
+    order = np.random.default_rng(RANDOM_STATE).permutation(n_rows)
+    n_test = int(round(n_rows * TEST_SIZE))
+    return order[n_test:], np.sort(order[:n_test])
+
+
+def build_model(name: str, params: dict, threads: int = 1):
+    factory, _, _ = MODELS[name]
+    model = factory(**params)
+    available = model.get_params()
+    # LogisticRegression ignores n_jobs for binary problems and warns about it
+    if "n_jobs" in available and not isinstance(model, LogisticRegression):
+        model.set_params(n_jobs=threads)
+    if "random_state" in available and "random_state" not in params:
+        model.set_params(random_state=RANDOM_STATE)
+    return model
+
+
+def evaluate(y_true, y_pred) -> dict:
+    return {
+        "accuracy": accuracy_score(y_true, y_pred),
+        "precision": precision_score(y_true, y_pred, average="weighted", zero_division=0),
+        "recall": recall_score(y_true, y_pred, average="weighted", zero_division=0),
+        "f1": f1_score(y_true, y_pred, average="weighted", zero_division=0),
+    }
+
+
+# (dataset, feature set) -> (X, y, transformer); filled before the pool forks
+_features = {}
+_threads = 1
+
+
+def _init_worker(threads, feature_loaders):
+    global _threads
+    _threads = threads
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    threadpool_limits(threads)
+    # A no-op under fork, which inherits the parent's features; spawned
+    # workers load them from the joblib cache instead
+    for key, load in feature_loaders.items():
+        if key not in _features:
+            _features[key] = load()
+
+
+def run_job(job: dict, train_rows: int, model_path=None) -> dict:
+    """Fit one configuration on the first train_rows training rows and score it on the test split"""
+    X, y, _ = _features[(job["dataset"], job["features"])]
+    train, test = split_rows(len(y))
+    rows = np.sort(train[:train_rows])
+    model = build_model(job["model"], job["params"], _threads)
+    start = time.perf_counter()
+    model.fit(X[rows], y[rows])
+    fit_seconds = time.perf_counter() - start
+    metrics = evaluate(y[test], model.predict(X[test]))
+    metrics["fit_seconds"] = round(fit_seconds, 3)
+    if model_path:
+        joblib.dump(model, model_path)
+    return metrics
+
+
+class RunTracker:
+    """Local file-based run tracking in place of the remote MLflow server."""
+
+    COLUMNS = ["run_key", "run_id", "dataset", "features", "model", "params", "train_rows",
+               "accuracy", "precision", "recall", "f1", "fit_seconds", "status", "finished_at"]
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = os.path.join(path, "runs.csv")
+        os.makedirs(path, exist_ok=True)
+        self.completed = {}
+        if os.path.exists(self.index_path):
+            runs = pd.read_csv(self.index_path)
+            for row in runs[runs["status"] == "completed"].to_dict("records"):
+                self.completed[row["run_key"]] = row
+
+    def run_dir(self, run_id):
+        return os.path.join(self.path, run_id)
+
+    def model_path(self, run_id):
+        return os.path.join(self.run_dir(run_id), "model.joblib")
+
+    def lookup(self, run_id, train_rows):
+        row = self.completed.get(f"{run_id}@{train_rows}")
+        return None if row is None else {name: row[name] for name in ("accuracy", "precision", "recall", "f1",
+                                                                      "fit_seconds")}
+
+    def start(self, job):
+        os.makedirs(self.run_dir(job["run_id"]), exist_ok=True)
+        with open(os.path.join(self.run_dir(job["run_id"]), "params.json"), "w") as f:
+            json.dump({name: job[name] for name in ("dataset", "data_digest", "features", "feature_config",
+                                                    "model", "params")}, f, indent=2)
+
+    def record(self, job, train_rows, metrics, status="completed"):
+        row = {"run_key": f"{job['run_id']}@{train_rows}", "run_id": job["run_id"], "dataset": job["dataset"],
+               "features": job["features"], "model": job["model"], "params": json.dumps(job["params"]),
+               "train_rows": train_rows, **{name: metrics.get(name) for name in ("accuracy", "precision", "recall",
+                                                                                  "f1", "fit_seconds")},
+               "status": status, "finished_at": datetime.now().isoformat()}
+        pd.DataFrame([row], columns=self.COLUMNS).to_csv(
+            self.index_path, mode="a", index=False, header=not os.path.exists(self.index_path))
+        if status == "completed":
+            self.completed[row["run_key"]] = row
+        self.update_status(job["run_id"], "running" if status == "completed" else status,
+                           rungs={str(train_rows): metrics})
+
+    def update_status(self, run_id, status, rungs=None):
+        metrics_path = os.path.join(self.run_dir(run_id), "metrics.json")
+        summary = {"status": status, "rungs": {}}
+        if os.path.exists(metrics_path):
+            with open(metrics_path) as f:
+                summary["rungs"] = json.load(f)["rungs"]
+        summary["rungs"].update(rungs or {})
+        with open(metrics_path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+def make_jobs(datasets, feature_sets, model_names, digests) -> list:
+    jobs = []
+    for dataset in datasets:
+        for feature_set in feature_sets:
+            is_sparse = sparse.issparse(_features[(dataset, feature_set)][0])
+            feature_config = FEATURE_SETS.get(feature_set, {})
+            for name in model_names:
+                _, grid, accepts_sparse = MODELS[name]
+                if is_sparse and not accepts_sparse:
+                    print(f"Skipping {name} on {feature_set}: needs dense input")
+                    continue
+                for params in ParameterGrid(grid):
+                    key = json.dumps([digests[(dataset, feature_set)], feature_config, params], sort_keys=True)
+                    run_hash = hashlib.blake2b(key.encode("utf-8"), digest_size=4).hexdigest()
+                    jobs.append({"run_id": f"{dataset}-{feature_set}-{name}-{run_hash}", "dataset": dataset,
+                                 "data_digest": digests[(dataset, feature_set)], "features": feature_set,
+                                 "feature_config": feature_config, "model": name, "params": params})
+    return jobs
+
+
+def dominated(results: dict, margin: float) -> set:
+    """Run ids whose F1 trails the best by more than margin, or that another run beats on both F1 and fit time"""
+    best = max(metrics["f1"] for metrics in results.values())
+    out = set()
+    for run_id, metrics in results.items():
+        if metrics["f1"] < best - margin:
+            out.add(run_id)
+            continue
+        for other_id, other in results.items():
+            if other_id != run_id and other["f1"] >= metrics["f1"] and other["fit_seconds"] <= metrics["fit_seconds"] \
+                    and (other["f1"] > metrics["f1"] or other["fit_seconds"] < metrics["fit_seconds"]):
+                out.add(run_id)
+                break
+    return out
+
+
+def _dump_atomic(obj, path):
+    # Write beside and rename, so a reloading app never sees a partial file
+    tmp_path = path + ".tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def export(job, tracker, destinations):
+    transformer = _features[(job["dataset"], job["features"])][2]
+    model = joblib.load(tracker.model_path(job["run_id"]))
+    engine_dir = destinations.get("engine")
+    if engine_dir:
+        # Build and check the engine beside the live one before replacing anything,
+        # so a failed export leaves the pickles and the engine the app loads as they were
+        from engine import SAMPLE_REVIEWS, Engine, check_parity, export_engine
+        staging_dir = engine_dir + ".new"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        try:
+            export_engine(transformer, model, staging_dir)
+            check_parity(Engine(staging_dir), transformer, model, SAMPLE_REVIEWS)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+    _dump_atomic(model, destinations["model"])
+    _dump_atomic(transformer, destinations["transformer"])
+    if engine_dir:
+        retired_dir = engine_dir + ".old"
+        shutil.rmtree(retired_dir, ignore_errors=True)
+        if os.path.exists(engine_dir):
+            os.replace(engine_dir, retired_dir)
+        os.replace(staging_dir, engine_dir)
+        shutil.rmtree(retired_dir, ignore_errors=True)
+    print(f"Exported {job['run_id']} to {', '.join(destinations.values())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", nargs="+", default=DATASETS)
+    parser.add_argument("--features", nargs="+", default=["tfidf", "review"],
+                        help=f"Any of {', '.join(FEATURE_SETS)}, or store:<name>[+<name>...] for feature store "
+                             f"representations")
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    parser.add_argument("--input-dir", default=DEFAULT_INPUT_DIR)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--runs-dir", default=DEFAULT_RUNS_DIR)
+    parser.add_argument("--text-column", default="processed_text")
+    parser.add_argument("--label-column", default="label")
+    parser.add_argument("--cpus", type=int, default=os.cpu_count())
+    parser.add_argument("--threads-per-job", type=int, default=1)
+    parser.add_argument("--rungs", type=float, nargs="+", default=[0.1, 0.3, 1.0],
+                        help="Increasing fractions of the training rows; the last should be 1")
+    parser.add_argument("--margin", type=float, default=0.02,
+                        help="Abandon configurations whose F1 trails the best by more than this")
+    parser.add_argument("--no-export", action="store_true", help="Do not overwrite the app model files")
+    args = parser.parse_args()
+
+    memory = joblib.Memory(args.cache_dir, mmap_mode="r", verbose=0)
+    cached_features = memory.cache(compute_features, ignore=["data_path"])
+    digests, loaders = {}, {}
+    for dataset in args.datasets:
+        data_path = os.path.join(args.input_dir, f"{dataset}_features.csv")
+        data_digest = None
+        for feature_set in args.features:
+            key = (dataset, feature_set)
+            if feature_set.startswith("store:"):
+                name = feature_set.split(":", 1)[1]
+                digests[key] = FeatureStore(os.path.join(args.store, dataset)).manifest["version"]
+                loaders[key] = partial(load_store_features, args.store, dataset, name)
+            else:
+                data_digest = data_digest or file_digest(data_path)
+                digests[key] = data_digest
+                loaders[key] = partial(cached_features, data_path, data_digest, feature_set,
+                                       FEATURE_SETS[feature_set], args.text_column, args.label_column)
+            _features[key] = loaders[key]()
+
+    tracker = RunTracker(args.runs_dir)
+    active = make_jobs(args.datasets, args.features, args.models, digests)
+    for job in active:
+        tracker.start(job)
+    threads = max(1, min(args.threads_per_job, args.cpus))
+    workers = max(1, args.cpus // threads)
+    print(f"{len(active)} configurations, {workers} workers x {threads} threads")
+
+    start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method),
+                             initializer=_init_worker, initargs=(threads, {} if start_method else loaders)) as pool:
+        for rung, fraction in enumerate(args.rungs):
+            final = rung == len(args.rungs) - 1
+            results = {}
+            futures = {}
+            for job in active:
+                n_train = len(split_rows(len(_features[(job["dataset"], job["features"])][1]))[0])
+                train_rows = max(1, math.ceil(n_train * fraction))
+                recorded = tracker.lookup(job["run_id"], train_rows)
+                if recorded and (not final or os.path.exists(tracker.model_path(job["run_id"]))):
+                    results[job["run_id"]] = recorded
+                    continue
+                model_path = tracker.model_path(job["run_id"]) if final else None
+                futures[pool.submit(run_job, job, train_rows, model_path)] = (job, train_rows)
+            print(f"Rung {rung + 1}/{len(args.rungs)} ({fraction:g} of training rows): "
+                  f"{len(futures)} to run, {len(results)} recorded")
+
+            for future in as_completed(futures):
+                job, train_rows = futures[future]
+                try:
+                    metrics = future.result()
+                except Exception as e:
+                    print(f"{job['run_id']} failed: {e}")
+                    tracker.record(job, train_rows, {}, status="failed")
+                    continue
+                tracker.record(job, train_rows, metrics)
+                results[job["run_id"]] = metrics
+
+            active = [job for job in active if job["run_id"] in results]
+            if final:
+                for job in active:
+                    tracker.update_status(job["run_id"], "finished")
+                break
+            abandoned = set()
+            for feature_set in args.features:
+                group = {job["run_id"]: results[job["run_id"]] for job in active if job["features"] == feature_set}
+                if group:
+                    abandoned |= dominated(group, args.margin)
+            for run_id in abandoned:
+                tracker.update_status(run_id, "abandoned")
+            active = [job for job in active if job["run_id"] not in abandoned]
+            print(f"Abandoned {len(abandoned)} dominated configurations, {len(active)} remain")
+
+    for feature_set in args.features:
+        group = [job for job in active if job["features"] == feature_set]
+        if not group:
+            continue
+        best = max(group, key=lambda job: results[job["run_id"]]["f1"])
+        print(f"Best {feature_set}: {best['run_id']} {json.dumps(best['params'])} "
+              f"F1 {results[best['run_id']]['f1']:.4f}")
+        if feature_set not in EXPORTS or args.no_export:
+            continue
+        if "engine" in EXPORTS[feature_set]:
+            exportable = [job for job in group if job["model"] in ENGINE_MODELS]
+            if not exportable:
+                print(f"Not exporting {feature_set}: none of {', '.join(sorted(ENGINE_MODELS))} completed")
+                continue
+            best = max(exportable, key=lambda job: results[job["run_id"]]["f1"])
+            print(f"Exporting {best['run_id']}, the best {feature_set} model the engine supports "
+                  f"(F1 {results[best['run_id']]['f1']:.4f})")
+        export(best, tracker, EXPORTS[feature_set])
+
+
+if __name__ == "__main__":
+    main()